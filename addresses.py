@@ -0,0 +1,203 @@
+"""Address parsing and canonical geocode cache keys.
+
+"230 Bernard Ave", "230 bernard avenue" and "230 Bernard Ave, Los Angeles,
+CA" all geocode to the same point, so they should share one cache entry.
+canonical_address() tokenizes an address into house number, directional,
+street name, suffix and unit, expands the usual abbreviations to one
+spelling, and drops the state and a plain "Los Angeles". A neighbourhood
+stays: "100 W 5th St, San Pedro" and "100 W 5th St" downtown are different
+points.
+"""
+
+import re
+from dataclasses import dataclass
+
+DIRECTIONS = {
+    "n": "n",
+    "north": "n",
+    "s": "s",
+    "south": "s",
+    "e": "e",
+    "east": "e",
+    "w": "w",
+    "west": "w",
+}
+
+# USPS spellings → the abbreviation used in keys
+SUFFIXES = {
+    "alley": "aly",
+    "aly": "aly",
+    "avenue": "ave",
+    "ave": "ave",
+    "av": "ave",
+    "boulevard": "blvd",
+    "blvd": "blvd",
+    "circle": "cir",
+    "cir": "cir",
+    "court": "ct",
+    "ct": "ct",
+    "drive": "dr",
+    "dr": "dr",
+    "highway": "hwy",
+    "hwy": "hwy",
+    "lane": "ln",
+    "ln": "ln",
+    "parkway": "pkwy",
+    "pkwy": "pkwy",
+    "place": "pl",
+    "pl": "pl",
+    "road": "rd",
+    "rd": "rd",
+    "square": "sq",
+    "sq": "sq",
+    "street": "st",
+    "st": "st",
+    "terrace": "ter",
+    "ter": "ter",
+    "trail": "trl",
+    "trl": "trl",
+    "walk": "walk",
+    "way": "way",
+}
+
+UNIT_WORDS = frozenset({"apt", "apartment", "unit", "ste", "suite", "#", "no"})
+
+STATE_WORDS = frozenset({"ca", "california", "usa", "us"})
+
+# Place names the geocoder resolves inside the City of LA. They stay in keys
+# like any other city, since a street number can repeat across them, but
+# the gazetteer (which covers the whole city) still answers for them.
+LA_NEIGHBOURHOODS = frozenset(
+    {
+        "venice",
+        "hollywood",
+        "north hollywood",
+        "van nuys",
+        "sherman oaks",
+        "studio city",
+        "encino",
+        "tarzana",
+        "woodland hills",
+        "reseda",
+        "northridge",
+        "canoga park",
+        "san pedro",
+        "wilmington",
+        "harbor city",
+        "playa del rey",
+        "westchester",
+        "sun valley",
+        "sylmar",
+        "tujunga",
+        "sunland",
+        "pacoima",
+        "panorama city",
+        "chatsworth",
+        "granada hills",
+        "mission hills",
+        "north hills",
+        "porter ranch",
+        "winnetka",
+        "west hills",
+        "valley village",
+        "toluca lake",
+        "eagle rock",
+        "highland park",
+        "silver lake",
+        "echo park",
+        "los feliz",
+        "pacific palisades",
+        "brentwood",
+        "westwood",
+        "mar vista",
+        "palms",
+    }
+)
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[/-][a-z0-9]+)*|#")
+_ZIP = re.compile(r"\d{5}(?:-\d{4})?")
+
+
+@dataclass(frozen=True, slots=True)
+class ParsedAddress:
+    number: str = ""
+    predir: str = ""
+    name: str = ""
+    suffix: str = ""
+    postdir: str = ""
+    unit: str = ""
+    city: str = ""
+    zip: str = ""
+
+    def street_key(self) -> str:
+        """House number through post-directional: one address point."""
+        parts = [self.number, self.predir, self.name, self.suffix, self.postdir]
+        return " ".join(p for p in parts if p)
+
+    def key(self) -> str:
+        unit = f"unit {self.unit}" if self.unit else ""
+        return " ".join(p for p in [self.street_key(), unit, self.city, self.zip] if p)
+
+
+def parse_address(address: str) -> ParsedAddress:
+    """Split a one-line address into its parts (best effort)."""
+    street, _, rest = address.lower().partition(",")
+    tokens = _TOKEN.findall(street)
+    tail = _TOKEN.findall(rest)
+
+    number = ""
+    if tokens and tokens[0][0].isdigit():
+        number = tokens.pop(0)
+    predir = ""
+    if len(tokens) > 1 and tokens[0] in DIRECTIONS:
+        predir = DIRECTIONS[tokens.pop(0)]
+
+    unit = ""
+    for i, token in enumerate(tokens):
+        if token in UNIT_WORDS and i > 0 and i + 1 < len(tokens):
+            unit = tokens[i + 1]
+            tokens, tail = tokens[:i], tokens[i + 2 :] + tail
+            break
+
+    # The last suffix word that isn't the whole name ends the street name;
+    # words after it are a post-directional or the city without a comma
+    suffix = postdir = ""
+    for i in range(len(tokens) - 1, 0, -1):
+        if tokens[i] in SUFFIXES:
+            suffix = SUFFIXES[tokens[i]]
+            after = tokens[i + 1 :]
+            if after and after[0] in DIRECTIONS:
+                postdir = DIRECTIONS[after.pop(0)]
+            tokens, tail = tokens[:i], after + tail
+            break
+
+    # Peel ZIP, state and "Los Angeles" off the end in any order, so
+    # normalize_address's ", Los Angeles, CA" after a neighbourhood drops too
+    zip_code = ""
+    while tail:
+        if _ZIP.fullmatch(tail[-1]):
+            zip_code = zip_code or tail[-1][:5]
+            del tail[-1]
+        elif tail[-1] in STATE_WORDS or tail[-1] == "la":
+            del tail[-1]
+        elif tail[-2:] == ["los", "angeles"]:
+            del tail[-2:]
+        else:
+            break
+    city = " ".join(tail)
+
+    return ParsedAddress(
+        number=number,
+        predir=predir,
+        name=" ".join(tokens),
+        suffix=suffix,
+        postdir=postdir,
+        unit=unit,
+        city=city,
+        zip=zip_code,
+    )
+
+
+def canonical_address(address: str) -> str:
+    """Geocode cache key: equal for spellings of the same LA address."""
+    return parse_address(address).key()
@@ -0,0 +1,105 @@
+"""Persistent second-tier cache for ArcGIS lookups, using SQLite.
+
+Sits behind the in-memory TTLCaches in la_sweep_bot so geocodes and route
+queries survive restarts. Reads are awaited; writes are queued behind the
+response (write-behind). Each process writes its own file: on Fly the bot
+and web processes run on separate machines, each with its own volume, so
+their caches are never shared.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any
+
+import aiosqlite
+
+from db import DB_PATH
+
+CACHE_DB_PATH = os.environ.get(
+    "SWEEP_CACHE_PATH", os.path.join(os.path.dirname(DB_PATH), "lookup_cache.db")
+)
+
+logger = logging.getLogger(__name__)
+
+_conn: aiosqlite.Connection | None = None
+# Write-behind tasks still running; held so they aren't garbage-collected
+_pending: set[asyncio.Task] = set()
+
+MISS = object()
+
+
+async def open_cache(path: str | None = None) -> None:
+    """Open (creating if needed) the cache database."""
+    global _conn
+    _conn = await aiosqlite.connect(path or CACHE_DB_PATH)
+    # WAL so reads don't wait on the write-behind queue's commits
+    await _conn.execute("PRAGMA journal_mode=WAL")
+    await _conn.execute("PRAGMA synchronous=NORMAL")
+    await _conn.execute("""
+        CREATE TABLE IF NOT EXISTS lookup_cache (
+            namespace TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (namespace, key)
+        ) WITHOUT ROWID
+    """)
+    await _conn.execute(
+        "DELETE FROM lookup_cache WHERE expires_at <= ?", (time.time(),)
+    )
+    await _conn.commit()
+
+
+async def close_cache() -> None:
+    """Flush pending writes and close the cache database."""
+    global _conn
+    if _pending:
+        await asyncio.gather(*_pending, return_exceptions=True)
+    if _conn is not None:
+        await _conn.close()
+        _conn = None
+
+
+async def cache_get(namespace: str, key: str) -> Any:
+    """Return the cached value, or MISS if absent/expired/cache closed."""
+    if _conn is None:
+        return MISS
+    try:
+        cursor = await _conn.execute(
+            "SELECT value FROM lookup_cache "
+            "WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, time.time()),
+        )
+        row = await cursor.fetchone()
+    except aiosqlite.Error:
+        logger.exception("Lookup cache read failed")
+        return MISS
+    if row is None:
+        return MISS
+    return json.loads(row[0])
+
+
+def cache_put(namespace: str, key: str, value: Any, ttl: float) -> None:
+    """Queue a write; returns immediately. No-op when the cache is closed."""
+    if _conn is None:
+        return
+    task = asyncio.ensure_future(_write(namespace, key, json.dumps(value), ttl))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+async def _write(namespace: str, key: str, value: str, ttl: float) -> None:
+    if _conn is None:
+        return
+    try:
+        await _conn.execute(
+            "INSERT OR REPLACE INTO lookup_cache (namespace, key, value, expires_at) "
+            "VALUES (?, ?, ?, ?)",
+            (namespace, key, value, time.time() + ttl),
+        )
+        await _conn.commit()
+    except aiosqlite.Error:
+        logger.exception("Lookup cache write failed")
@@ -1,18 +1,60 @@
 """Subscription persistence layer using SQLite."""
 
+import asyncio
 import json
 import os
+from collections.abc import AsyncIterator, Iterable
+from contextlib import asynccontextmanager
 
 import aiosqlite
 
+from records import Subscription
+
 DB_PATH = os.environ.get("SWEEP_DB_PATH", "subscriptions.db")
 
 MAX_SUBSCRIPTIONS_PER_USER = 5
 
+# One long-lived connection per process, opened by init_db. The lock makes
+# each function below run as a unit on it (e.g. cap check + insert + commit).
+_db: aiosqlite.Connection | None = None
+_lock: asyncio.Lock | None = None
+
+
+async def _open() -> aiosqlite.Connection:
+    db = await aiosqlite.connect(DB_PATH, cached_statements=256)
+    db.row_factory = aiosqlite.Row
+    await db.execute("PRAGMA journal_mode=WAL")
+    await db.execute("PRAGMA synchronous=NORMAL")
+    await db.execute("PRAGMA cache_size=-4000")  # 4 MB
+    await db.execute("PRAGMA temp_store=MEMORY")
+    await db.execute("PRAGMA busy_timeout=5000")
+    return db
+
+
+@asynccontextmanager
+async def _connect() -> AsyncIterator[aiosqlite.Connection]:
+    """Borrow the shared connection, opening it on first use."""
+    global _db, _lock
+    if _db is None or _lock is None:
+        _db = await _open()
+        _lock = asyncio.Lock()
+    async with _lock:
+        yield _db
+
+
+async def close_db() -> None:
+    """Close the shared connection (call on shutdown)."""
+    global _db, _lock
+    if _db is not None:
+        await _db.close()
+    _db = None
+    _lock = None
+
 
 async def init_db() -> None:
-    """Create tables if they don't exist."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    """Open the shared connection and create tables if they don't exist."""
+    await close_db()
+    async with _connect() as db:
         await db.execute("""
             CREATE TABLE IF NOT EXISTS subscriptions (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -31,6 +73,47 @@ async def init_db() -> None:
         await db.execute(
             "CREATE INDEX IF NOT EXISTS idx_subs_chat_id ON subscriptions(chat_id)"
         )
+        # One row per (subscription, sweep day), kept in sync by triggers, so
+        # the notification job can select due subscriptions by index
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS subscription_days (
+                subscription_id INTEGER NOT NULL,
+                sweep_day TEXT NOT NULL,
+                sweep_schedule TEXT NOT NULL,
+                PRIMARY KEY (subscription_id, sweep_day)
+            ) WITHOUT ROWID
+        """)
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sub_days_schedule "
+            "ON subscription_days(sweep_day, sweep_schedule)"
+        )
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS subscriptions_days_ai
+            AFTER INSERT ON subscriptions BEGIN
+                INSERT OR IGNORE INTO subscription_days
+                SELECT NEW.id, value, NEW.sweep_schedule FROM json_each(NEW.sweep_days);
+            END
+        """)
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS subscriptions_days_au
+            AFTER UPDATE OF sweep_days, sweep_schedule ON subscriptions BEGIN
+                DELETE FROM subscription_days WHERE subscription_id = OLD.id;
+                INSERT OR IGNORE INTO subscription_days
+                SELECT NEW.id, value, NEW.sweep_schedule FROM json_each(NEW.sweep_days);
+            END
+        """)
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS subscriptions_days_ad
+            AFTER DELETE ON subscriptions BEGIN
+                DELETE FROM subscription_days WHERE subscription_id = OLD.id;
+            END
+        """)
+        # Backfill rows created before the table existed
+        await db.execute("""
+            INSERT OR IGNORE INTO subscription_days
+            SELECT s.id, j.value, s.sweep_schedule
+            FROM subscriptions s, json_each(s.sweep_days) j
+        """)
         await db.commit()
 
 
@@ -45,7 +128,7 @@ async def add_subscription(
     street_name: str | None,
 ) -> str | None:
     """Insert or replace a subscription. Returns error string if at cap, else None."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         # Check cap (only for genuinely new subscriptions)
         cursor = await db.execute(
             "SELECT COUNT(*) FROM subscriptions WHERE chat_id = ? AND NOT (x = ? AND y = ?)",
@@ -84,7 +167,7 @@ async def add_subscription(
 
 async def remove_subscription(chat_id: int, sub_id: int) -> int:
     """Remove a single subscription by id. Returns rows deleted."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         cursor = await db.execute(
             "DELETE FROM subscriptions WHERE chat_id = ? AND id = ?",
             (chat_id, sub_id),
@@ -95,7 +178,7 @@ async def remove_subscription(chat_id: int, sub_id: int) -> int:
 
 async def remove_all_subscriptions(chat_id: int) -> int:
     """Remove all subscriptions for a user. Returns rows deleted."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         cursor = await db.execute(
             "DELETE FROM subscriptions WHERE chat_id = ?", (chat_id,)
         )
@@ -103,21 +186,82 @@ async def remove_all_subscriptions(chat_id: int) -> int:
         return cursor.rowcount
 
 
-async def get_user_subscriptions(chat_id: int) -> list[dict]:
+async def remove_subscriptions_for_chats(chat_ids: Iterable[int]) -> int:
+    """Remove all subscriptions for several users at once. Returns rows deleted."""
+    chat_ids = list(chat_ids)
+    if not chat_ids:
+        return 0
+    async with _connect() as db:
+        cursor = await db.executemany(
+            "DELETE FROM subscriptions WHERE chat_id = ?", [(c,) for c in chat_ids]
+        )
+        await db.commit()
+        return cursor.rowcount
+
+
+async def get_user_subscriptions(chat_id: int) -> list[Subscription]:
     """Get all subscriptions for a user."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with _connect() as db:
         cursor = await db.execute(
             "SELECT * FROM subscriptions WHERE chat_id = ? ORDER BY id", (chat_id,)
         )
         rows = await cursor.fetchall()
-        return [dict(r) for r in rows]
+        return [Subscription.from_row(r) for r in rows]
 
 
-async def get_all_subscriptions() -> list[dict]:
+async def get_all_subscriptions() -> list[Subscription]:
     """Get all subscriptions (for notification job)."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with _connect() as db:
         cursor = await db.execute("SELECT * FROM subscriptions")
         rows = await cursor.fetchall()
-        return [dict(r) for r in rows]
+        return [Subscription.from_row(r) for r in rows]
+
+
+async def get_schedule_pairs() -> list[tuple[str, str]]:
+    """Distinct (sweep_day, sweep_schedule) pairs across all subscriptions."""
+    async with _connect() as db:
+        cursor = await db.execute(
+            "SELECT DISTINCT sweep_day, sweep_schedule FROM subscription_days"
+        )
+        rows = await cursor.fetchall()
+        return [(day, schedule) for day, schedule in rows]
+
+
+def _due_query(pairs: list[tuple[str, str]]) -> tuple[str, list[str]]:
+    """SQL selecting subscriptions on any (sweep_day, sweep_schedule) pair."""
+    values = ", ".join(["(?, ?)"] * len(pairs))
+    sql = f"""
+        WITH due(sweep_day, sweep_schedule) AS (VALUES {values})
+        SELECT * FROM subscriptions WHERE id IN (
+            SELECT d.subscription_id FROM due
+            JOIN subscription_days d
+                ON d.sweep_day = due.sweep_day
+                AND d.sweep_schedule = due.sweep_schedule
+        )
+    """
+    return sql, [v for pair in pairs for v in pair]
+
+
+async def iter_subscriptions(
+    pairs: Iterable[tuple[str, str]] | None = None, batch_size: int = 500
+) -> AsyncIterator[Subscription]:
+    """
+    Stream subscriptions ordered by chat_id, `batch_size` rows at a time,
+    optionally only those due on `pairs`. Uses its own read-only connection
+    (WAL lets it run alongside writes) so the shared one isn't held for the
+    whole iteration.
+    """
+    if pairs is None:
+        sql, params = "SELECT * FROM subscriptions", []
+    else:
+        pairs = list(pairs)
+        if not pairs:
+            return
+        sql, params = _due_query(pairs)
+
+    async with aiosqlite.connect(f"file:{DB_PATH}?mode=ro", uri=True) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(sql + " ORDER BY chat_id, id", params)
+        while rows := await cursor.fetchmany(batch_size):
+            for row in rows:
+                yield Subscription.from_row(row)
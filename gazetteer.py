@@ -0,0 +1,188 @@
+"""Offline address-point gazetteer: LA addresses → points without the geocoder.
+
+Built from the City of LA address-points CSV export (`python la_sweep_bot.py
+import-addresses <csv>`) into a gzipped, sorted TSV of canonical street keys
+(see addresses.py). Loaded into packed arrays and searched with bisect, so a
+lookup is a parse plus a binary search.
+"""
+
+import csv
+import gzip
+import logging
+import os
+import time
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+from typing import BinaryIO
+
+from addresses import DIRECTIONS, LA_NEIGHBOURHOODS, parse_address
+
+GAZETTEER_PATH = os.environ.get("SWEEP_GAZETTEER_PATH", "address_points.tsv.gz")
+
+# Address-points CSV columns
+CSV_NUMBER = "HSE_NBR"
+CSV_PREDIR = "HSE_DIR_CD"
+CSV_NAME = "STR_NM"
+CSV_SUFFIX = "STR_SFX_CD"
+CSV_POSTDIR = "STR_SFX_DIR_CD"
+CSV_ZIP = "ZIP_CD"
+CSV_LAT = "LAT"
+CSV_LON = "LON"
+
+# Coordinates are held as integer microdegrees (~0.1 m), 4 bytes each
+COORD_SCALE = 1_000_000
+
+logger = logging.getLogger(__name__)
+
+
+class Gazetteer:
+    """
+    Sorted (street key, zip) → point table. A key that maps to several
+    points is only answered when the caller's ZIP picks one of them.
+
+    Rows are packed for a city-sized file (~1M points): the keys share one
+    ASCII blob indexed by an offsets array, and ZIPs and coordinates are
+    machine ints, so a row costs its key's bytes plus ~16.
+    """
+
+    def __init__(self):
+        self._blob = bytearray()
+        self._offsets = array("I", [0])
+        self.zips = array("I")  # 0 when the row has no ZIP
+        self.xs = array("i")  # microdegrees
+        self.ys = array("i")
+
+    def __len__(self) -> int:
+        return len(self.zips)
+
+    def __getitem__(self, i: int) -> bytes:
+        """Row `i`'s key as stored (lets bisect search the blob directly)."""
+        return self._blob[self._offsets[i] : self._offsets[i + 1]]
+
+    def key(self, i: int) -> str:
+        return self[i].decode("ascii")
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[bytes]) -> "Gazetteer":
+        """
+        Pack the gazetteer file's lines (tab-separated key, ZIP, x, y in
+        microdegrees; sorted by key) without building per-row objects.
+        """
+        gazetteer = cls()
+        blob, offsets = gazetteer._blob, gazetteer._offsets
+        zips, xs, ys = gazetteer.zips, gazetteer.xs, gazetteer.ys
+        last = b""
+        for line in lines:
+            key, zip_code, x, y = line.split(b"\t")
+            if key < last:
+                raise ValueError(f"Gazetteer rows out of order at {key!r}")
+            last = key
+            blob += key
+            offsets.append(len(blob))
+            zips.append(int(zip_code or 0))
+            xs.append(int(x))
+            ys.append(int(y))
+        return gazetteer
+
+    def _prefixed(self, prefix: str) -> range:
+        """Row indices whose key is `prefix` or starts with `prefix + ' '`."""
+        lo = bisect_left(self, prefix.encode())
+        hi = bisect_left(self, prefix.encode() + b"!", lo)  # "!" sorts after " "
+        return range(lo, hi)
+
+    def lookup(self, address: str) -> dict | None:
+        """geocode_address-style result, or None if not a unique local match."""
+        parsed = parse_address(address)
+        if not parsed.number or not parsed.name:
+            return None
+        if parsed.city and parsed.city not in LA_NEIGHBOURHOODS:
+            return None
+        key = parsed.street_key()
+
+        rows = [i for i in self._prefixed(key) if self.key(i) == key]
+        if not rows and not parsed.suffix:
+            # "230 Bernard" → any one-word suffix ("230 bernard ave")
+            rows = [
+                i for i in self._prefixed(key) if " " not in self.key(i)[len(key) + 1 :]
+            ]
+        if not rows and not parsed.predir:
+            # "100 Main St" → "100 s main st" when only one direction exists
+            rest = key[len(parsed.number) :]
+            for d in sorted(set(DIRECTIONS.values())):
+                probe = f"{parsed.number} {d}{rest}"
+                rows += [i for i in self._prefixed(probe) if self.key(i) == probe]
+        if parsed.zip:
+            rows = [i for i in rows if self.zips[i] == int(parsed.zip)]
+        if len({(self.xs[i], self.ys[i]) for i in rows}) != 1:
+            return None
+
+        i = rows[0]
+        return {
+            "x": self.xs[i] / COORD_SCALE,
+            "y": self.ys[i] / COORD_SCALE,
+            "match_addr": _display(self.key(i), self.zips[i]),
+            "score": 100,
+        }
+
+
+def _display(key: str, zip_code: int) -> str:
+    words = [w.upper() if w in DIRECTIONS.values() else w.title() for w in key.split()]
+    place = f"{' '.join(words)}, Los Angeles, California"
+    return f"{place}, {zip_code:05d}" if zip_code else place
+
+
+def import_address_points(csv_path: str, path: str = GAZETTEER_PATH) -> int:
+    """Build the gazetteer file from an address-points CSV. Returns row count."""
+    rows = set()
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        for rec in csv.DictReader(f):
+            try:
+                x, y = float(rec[CSV_LON]), float(rec[CSV_LAT])
+            except (KeyError, TypeError, ValueError):
+                continue
+            street = " ".join(
+                (rec.get(field) or "").strip()
+                for field in (CSV_NUMBER, CSV_PREDIR, CSV_NAME, CSV_SUFFIX, CSV_POSTDIR)
+            )
+            key = parse_address(street).street_key()
+            if key:
+                zip_code = (rec.get(CSV_ZIP) or "").strip()[:5]
+                x, y = round(x * COORD_SCALE), round(y * COORD_SCALE)
+                rows.add((key, zip_code, x, y))
+
+    tmp = f"{path}.tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        for key, zip_code, x, y in sorted(rows):
+            f.write(f"{key}\t{zip_code}\t{x}\t{y}\n")
+    os.replace(tmp, path)
+    return len(rows)
+
+
+def _read_lines(f: BinaryIO, size: int = 1 << 20) -> Iterator[bytes]:
+    """
+    Lines of `f` without their newlines, read in `size` chunks. Faster than
+    GzipFile's own line iteration.
+    """
+    rest = b""
+    while chunk := f.read(size):
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+        yield from lines
+    if rest:
+        yield rest
+
+
+def load_gazetteer(path: str = GAZETTEER_PATH) -> Gazetteer | None:
+    """Load the gazetteer file. Returns None if it hasn't been imported."""
+    if not os.path.exists(path):
+        return None
+    started = time.monotonic()
+    # Streamed straight into the packed arrays; the file is already sorted
+    with gzip.open(path, "rb") as f:
+        gazetteer = Gazetteer.from_lines(_read_lines(f))
+    logger.info(
+        f"Loaded {len(gazetteer)} address points from {path} "
+        f"in {time.monotonic() - started:.1f}s"
+    )
+    return gazetteer
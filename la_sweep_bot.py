@@ -17,19 +17,22 @@ Setup:
   3. python la_sweep_bot.py
 """
 
+import asyncio
 import json
+import math
 import os
 import logging
 import re
-from collections import Counter
+import sys
+from collections import Counter, defaultdict
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable, Sequence
 from datetime import datetime, date, timedelta, time as dt_time
 from zoneinfo import ZoneInfo
 
-from cachetools import TTLCache
+from cachetools import LRUCache, TTLCache
 import httpx
 from dotenv import load_dotenv
 from telegram import Update
-from telegram.error import Forbidden
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -38,13 +41,44 @@ from telegram.ext import (
     filters,
 )
 
+from addresses import canonical_address
+from cache_db import MISS, cache_get, cache_put, close_cache, open_cache
 from db import (
+    close_db,
     init_db,
     add_subscription,
     remove_subscription,
     remove_all_subscriptions,
+    remove_subscriptions_for_chats,
     get_user_subscriptions,
-    get_all_subscriptions,
+    get_schedule_pairs,
+    iter_subscriptions,
+)
+from gazetteer import (
+    GAZETTEER_PATH,
+    Gazetteer,
+    import_address_points,
+    load_gazetteer,
+)
+from notifier import NotificationSender
+from records import RouteRecord, Subscription
+from route_index import (
+    REPLICA_PATH,
+    Box,
+    RouteIndex,
+    boxes_intersect,
+    load_replica,
+    merge_boxes,
+    paths_bbox,
+    paths_intersect_box,
+    sync_replica,
+)
+from schedule_index import ScheduleIndex, StreetSegment
+from sweep_calendar import (
+    SweepCalendar,
+    days_to_mask,
+    schedule_code,
+    sweep_day_mask,
 )
 
 load_dotenv()
@@ -58,23 +92,26 @@ LA_TZ = ZoneInfo("America/Los_Angeles")
 
 # ArcGIS geocoder (authenticated with API key for 20k free geocodes/month)
 GEOCODE_URL = "https://geocode.arcgis.com/arcgis/rest/services/World/GeocodeServer/findAddressCandidates"
+# Batch geocoding (requires the API key) and the locator info holding MaxBatchSize
+GEOCODE_BATCH_URL = "https://geocode.arcgis.com/arcgis/rest/services/World/GeocodeServer/geocodeAddresses"
+GEOCODE_INFO_URL = "https://geocode.arcgis.com/arcgis/rest/services/World/GeocodeServer"
+# Used until the locator reports its own MaxBatchSize
+DEFAULT_GEOCODE_BATCH_SIZE = 150
 # Layer 0 = Centerlines_Centroid_Routes_v2 (centerlines with sweep schedule joined)
 ROUTES_URL = "https://services5.arcgis.com/7nsPwEMP38bSkCjy/arcgis/rest/services/Clean_Street_Routes/FeatureServer/0/query"
-
-# 2026 LA city holidays (no sweep enforcement)
-HOLIDAYS_2026 = {
-    date(2026, 1, 1),  # New Year's Day
-    date(2026, 1, 19),  # MLK Day
-    date(2026, 2, 16),  # Presidents' Day
-    date(2026, 3, 31),  # Cesar Chavez Day
-    date(2026, 5, 25),  # Memorial Day
-    date(2026, 7, 3),  # Independence Day (observed)
-    date(2026, 9, 7),  # Labor Day
-    date(2026, 11, 11),  # Veterans Day
-    date(2026, 11, 26),  # Thanksgiving
-    date(2026, 11, 27),  # Day after Thanksgiving
-    date(2026, 12, 25),  # Christmas
-}
+ROUTE_FIELDS = (
+    "Route,Posted_Day,Posted_Time,Boundaries,Weeks,Day_Short,STNAME,TDIR,STSFX"
+)
+# Route lookups are served from grid tiles: every feature in a TILE_DEG cell
+# plus a halo of the widest search radius, fetched once, so any point in the
+# cell is answered locally
+TILE_DEG = 0.005  # ~1,800 ft N-S
+# Uncached tiles fetched per routes query
+TILES_PER_QUERY = 8
+# get_sweep_details looks this far out, nearest first, for a posted route
+SEARCH_RADII_FT = (200, 500)
+# Routes kept per lookup, nearest centerline first
+ROUTE_LIMIT = 10
 
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -82,19 +119,89 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# In-memory TTL caches — keeps API quota usage low for repeated lookups
-_geocode_cache: TTLCache[str, dict | None] = TTLCache(
-    maxsize=1024, ttl=604_800
-)  # 7 days
-_routes_cache: TTLCache[tuple, list[dict]] = TTLCache(
-    maxsize=2048, ttl=86_400
-)  # 24 hours
+# In-memory TTL caches — keeps API quota usage low for repeated lookups.
+# Backed by the on-disk cache in cache_db so entries survive restarts.
+GEOCODE_TTL = 604_800  # 7 days
+# A match this good is the geocode of its own match_addr, so it may be
+# cached under that address's key too
+GEOCODE_ALIAS_MIN_SCORE = 90
+ROUTES_TTL = 86_400  # 24 hours
+_geocode_cache: TTLCache[str, dict | None] = TTLCache(maxsize=1024, ttl=GEOCODE_TTL)
+_tile_cache: TTLCache[tuple[int, int], RouteIndex] = TTLCache(
+    maxsize=1024, ttl=ROUTES_TTL
+)
+
+# One pooled client per process for all ArcGIS traffic, so repeat lookups
+# reuse open HTTP/2 connections instead of paying a TCP+TLS handshake each.
+_http_client: httpx.AsyncClient | None = None
+
+# Upstream requests currently in flight, keyed by (kind, cache key). Concurrent
+# misses for the same key await the one request instead of each firing their own.
+_inflight: dict[tuple, asyncio.Future] = {}
+# How many calls were served by joining an in-flight request, per kind
+coalesce_stats: Counter[str] = Counter()
+# Route tiles being loaded, each resolved (None if it failed) by whichever
+# query covers it, so a lookup joins a batch prefetch holding its tile
+_tile_inflight: dict[tuple[int, int], asyncio.Future[RouteIndex | None]] = {}
+_tile_loads: set[asyncio.Task] = set()
+
+# Local replica of the routes layer (see `python la_sweep_bot.py sync-routes`).
+# Loaded once on first use; None means not synced, so fall back to ArcGIS.
+_route_index: RouteIndex | None = None
+_route_index_loaded = False
+# Schedule → street segments, built from the replica above on first use
+_schedule_index: tuple[RouteIndex, ScheduleIndex] | None = None
+
+# Offline address points (see `python la_sweep_bot.py import-addresses <csv>`),
+# loaded the same way; None means geocode through ArcGIS only.
+_gazetteer: Gazetteer | None = None
+_gazetteer_loaded = False
+
+# geocodeAddresses records-per-request limit, read from the locator once
+_geocode_batch_size: int | None = None
 
 # ---------------------------------------------------------------------------
 # ArcGIS helpers
 # ---------------------------------------------------------------------------
 
 
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared ArcGIS client, creating it on first use."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=15,
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=20,
+                max_keepalive_connections=10,
+                keepalive_expiry=120,
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared client (call on shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def _single_flight[T](key: tuple, fetch: Callable[[], Awaitable[T]]) -> T:
+    """Run `fetch` once per key; concurrent callers with the same key share it."""
+    fut = _inflight.get(key)
+    if fut is not None:
+        coalesce_stats[key[0]] += 1
+        return await asyncio.shield(fut)
+
+    task = asyncio.ensure_future(fetch())
+    _inflight[key] = task
+    task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return await asyncio.shield(task)
+
+
 def normalize_address(address: str) -> str:
     """Append ', Los Angeles, CA' if the address doesn't mention LA."""
     if not re.search(r"\blos angeles\b|\bla\b", address, re.IGNORECASE):
@@ -102,13 +209,73 @@ def normalize_address(address: str) -> str:
     return address
 
 
+async def _store_geocode(cache_key: str, result: dict | None) -> None:
+    """
+    Cache a geocode under its key, and for a confident match also under the
+    key of the resolved match_addr, so later inputs spelled like the
+    geocoder's own address ("..., Venice, California, 90291") hit too. A fuzzy
+    match's score would be wrong for the exact address, so those aren't
+    aliased, and an alias never replaces a better-scored entry.
+    """
+    _geocode_cache[cache_key] = result
+    cache_put("geocode", cache_key, result, GEOCODE_TTL)
+    if result is None or result["score"] < GEOCODE_ALIAS_MIN_SCORE:
+        return
+    alias = canonical_address(result["match_addr"])
+    if not alias or alias == cache_key:
+        return
+    existing = _geocode_cache.get(alias, MISS)
+    if existing is MISS:
+        existing = await cache_get("geocode", alias)
+    if existing not in (MISS, None) and existing.get("score", 0) >= result["score"]:
+        return
+    _geocode_cache[alias] = result
+    cache_put("geocode", alias, result, GEOCODE_TTL)
+
+
+def get_gazetteer() -> Gazetteer | None:
+    """Return the address-point gazetteer, loading it on first call if imported."""
+    global _gazetteer, _gazetteer_loaded
+    if not _gazetteer_loaded:
+        _gazetteer = load_gazetteer(GAZETTEER_PATH)
+        _gazetteer_loaded = True
+    return _gazetteer
+
+
+def _local_geocode(address: str) -> dict | None:
+    gazetteer = get_gazetteer()
+    return gazetteer.lookup(address) if gazetteer is not None else None
+
+
 async def geocode_address(address: str) -> dict | None:
-    """Geocode an address using ArcGIS World Geocoder. Returns {x, y, match_addr}."""
-    cache_key = " ".join(address.lower().split())
+    """
+    Geocode an address: the local gazetteer when imported, else the ArcGIS
+    World Geocoder. Returns {x, y, match_addr, score}.
+    """
+    cache_key = canonical_address(address)
     if cache_key in _geocode_cache:
         logger.info(f"Geocode cache hit: '{cache_key}'")
         return _geocode_cache[cache_key]
 
+    local = _local_geocode(address)
+    if local is not None:
+        logger.info(f"Geocode gazetteer hit: '{cache_key}'")
+        _geocode_cache[cache_key] = local
+        return local
+
+    cached = await cache_get("geocode", cache_key)
+    if cached is not MISS:
+        logger.info(f"Geocode disk cache hit: '{cache_key}'")
+        _geocode_cache[cache_key] = cached
+        return cached
+
+    return await _single_flight(
+        ("geocode", cache_key), lambda: _fetch_geocode(address, cache_key)
+    )
+
+
+async def _fetch_geocode(address: str, cache_key: str) -> dict | None:
+    """Upstream half of geocode_address: call ArcGIS and fill the cache."""
     params = {
         "f": "json",
         "singleLine": address,
@@ -120,13 +287,12 @@ async def geocode_address(address: str) -> dict | None:
     }
     if ARCGIS_API_KEY:
         params["token"] = ARCGIS_API_KEY
-    async with httpx.AsyncClient(timeout=15) as client:
-        resp = await client.get(GEOCODE_URL, params=params)
-        data = resp.json()
+    resp = await get_http_client().get(GEOCODE_URL, params=params)
+    data = resp.json()
 
     candidates = data.get("candidates", [])
     if not candidates:
-        _geocode_cache[cache_key] = None
+        await _store_geocode(cache_key, None)
         return None
 
     best = max(candidates, key=lambda c: c.get("score", 0))
@@ -137,179 +303,454 @@ async def geocode_address(address: str) -> dict | None:
         "match_addr": best["attributes"].get("Match_addr", address),
         "score": best.get("score", 0),
     }
-    _geocode_cache[cache_key] = result
+    await _store_geocode(cache_key, result)
     return result
 
 
-async def query_sweep_routes(x: float, y: float, radius_ft: int = 200) -> list[dict]:
+async def geocode_addresses(
+    addresses: Iterable[str],
+    concurrency: int = 8,
+    on_result: Callable[[str, dict | None], None] | None = None,
+) -> dict[str, dict | None]:
     """
-    Spatial query: find sweep routes within `radius_ft` feet of a point.
-    Returns list of route attribute dicts.
-
-    Uses an envelope (bounding box) because this FeatureServer rejects
-    the `units` param needed for point-buffer queries.
-    ~0.000003 degrees/ft at LA's latitude.
+    Geocode many addresses; returns {address: geocode_address-style result}.
+    Cache and gazetteer misses go to geocodeAddresses in batches of the locator's
+    MaxBatchSize. Rows it can't match, and every miss when there is no API
+    key, fall back to geocode_address, `concurrency` at a time; a fallback
+    that raises comes back as None.
+
+    `on_result(address, result)` is called for each address as soon as its
+    own cache hit, batch or fallback resolves, so a caller can use the fast
+    rows without waiting for the slowest.
     """
-    cache_key = (round(x, 4), round(y, 4), radius_ft)
-    if cache_key in _routes_cache:
-        logger.info(f"Routes cache hit: {cache_key}")
-        return _routes_cache[cache_key]
+    addresses = list(addresses)
+    inputs: dict[str, list[str]] = defaultdict(list)  # cache key → addresses
+    for address in addresses:
+        inputs[canonical_address(address)].append(address)
+    by_key: dict[str, dict | None] = {}
+
+    def resolve(cache_key: str, result: dict | None) -> None:
+        by_key[cache_key] = result
+        if on_result is not None:
+            for address in inputs[cache_key]:
+                on_result(address, result)
+
+    misses: dict[str, str] = {}  # cache key → first address with that key
+    for cache_key, (address, *_) in inputs.items():
+        if cache_key in _geocode_cache:
+            resolve(cache_key, _geocode_cache[cache_key])
+            continue
+        local = _local_geocode(address)
+        if local is not None:
+            _geocode_cache[cache_key] = local
+            resolve(cache_key, local)
+            continue
+        cached = await cache_get("geocode", cache_key)
+        if cached is not MISS:
+            _geocode_cache[cache_key] = cached
+            resolve(cache_key, cached)
+            continue
+        misses[cache_key] = address
 
-    deg_offset = radius_ft * 0.000003
-    envelope = f"{x - deg_offset},{y - deg_offset},{x + deg_offset},{y + deg_offset}"
+    slots = asyncio.Semaphore(concurrency)
 
-    params = {
+    async def single(cache_key: str, address: str) -> None:
+        async with slots:
+            try:
+                result = await geocode_address(address)
+            except Exception:
+                # One failed row (timeout, bad response) mustn't sink the rest
+                logger.exception(f"Geocode failed for '{address}'")
+                result = None
+        resolve(cache_key, result)
+
+    async def batch(chunk: list[tuple[str, str]]) -> None:
+        found = await _fetch_geocode_batch(chunk)
+        for cache_key, result in found.items():
+            resolve(cache_key, result)
+        failed = [(k, a) for k, a in chunk if k not in found]
+        if failed:
+            logger.info(f"Batch geocode: {len(failed)} single-line fallback(s)")
+        # This chunk's fallbacks start now, not after every other chunk
+        await asyncio.gather(*(single(k, a) for k, a in failed))
+
+    if ARCGIS_API_KEY and misses:
+        size = await _get_geocode_batch_size()
+        items = list(misses.items())
+        await asyncio.gather(
+            *(batch(items[i : i + size]) for i in range(0, len(items), size))
+        )
+    else:
+        if misses:
+            logger.info(f"Batch geocode: {len(misses)} single-line fallback(s)")
+        await asyncio.gather(*(single(k, a) for k, a in misses.items()))
+    return {address: by_key[canonical_address(address)] for address in addresses}
+
+
+async def _get_geocode_batch_size() -> int:
+    """The locator's MaxBatchSize, fetched once (default if unavailable)."""
+    global _geocode_batch_size
+    if _geocode_batch_size is None:
+        try:
+            resp = await get_http_client().get(
+                GEOCODE_INFO_URL, params={"f": "json", "token": ARCGIS_API_KEY}
+            )
+            props = resp.json().get("locatorProperties", {})
+            _geocode_batch_size = int(
+                props.get("MaxBatchSize", DEFAULT_GEOCODE_BATCH_SIZE)
+            )
+        except (httpx.HTTPError, ValueError):
+            logger.exception("Could not read geocoder MaxBatchSize")
+            return DEFAULT_GEOCODE_BATCH_SIZE
+    return _geocode_batch_size
+
+
+async def _fetch_geocode_batch(chunk: list[tuple[str, str]]) -> dict[str, dict]:
+    """
+    One geocodeAddresses call for (cache key, address) pairs. Returns results
+    for the matched rows only, and fills the caches with them.
+    """
+    records = [
+        {"attributes": {"OBJECTID": i, "SingleLine": address}}
+        for i, (_, address) in enumerate(chunk)
+    ]
+    data = {
         "f": "json",
-        "geometry": envelope,
-        "geometryType": "esriGeometryEnvelope",
-        "inSR": "4326",
-        "spatialRel": "esriSpatialRelIntersects",
-        "outFields": "Route,Posted_Day,Posted_Time,Boundaries,Weeks,Day_Short,STNAME,TDIR,STSFX",
-        "returnGeometry": "false",
-        "resultRecordCount": 10,
+        "addresses": json.dumps({"records": records}),
+        "sourceCountry": "USA",
+        "outSR": "4326",
+        "token": ARCGIS_API_KEY,
     }
-    async with httpx.AsyncClient(timeout=15) as client:
-        resp = await client.get(ROUTES_URL, params=params)
-        data = resp.json()
+    try:
+        resp = await get_http_client().post(GEOCODE_BATCH_URL, data=data)
+        payload = resp.json()
+    except (httpx.HTTPError, ValueError):
+        logger.exception("Batch geocode request failed")
+        return {}
+    if "error" in payload:
+        logger.error(f"Batch geocode error: {payload['error']}")
+        return {}
+
+    found = {}
+    for loc in payload.get("locations", []):
+        attrs = loc.get("attributes", {})
+        i = attrs.get("ResultID")
+        point = loc.get("location")
+        if not isinstance(i, int) or not 0 <= i < len(chunk):
+            continue
+        if attrs.get("Status") == "U" or not point:
+            continue
+        cache_key, address = chunk[i]
+        result = {
+            "x": point["x"],
+            "y": point["y"],
+            "match_addr": attrs.get("Match_addr") or loc.get("address") or address,
+            "score": loc.get("score", 0),
+        }
+        await _store_geocode(cache_key, result)
+        found[cache_key] = result
+    return found
+
+
+def get_route_index() -> RouteIndex | None:
+    """Return the local routes replica, loading it on first call if synced."""
+    global _route_index, _route_index_loaded
+    if not _route_index_loaded:
+        _route_index = load_replica(REPLICA_PATH)
+        _route_index_loaded = True
+    return _route_index
 
-    if "error" in data:
-        logger.error(f"ArcGIS query error: {data['error']}")
+
+def get_schedule_index() -> ScheduleIndex | None:
+    """Schedule index over the routes replica, or None if it isn't synced."""
+    global _schedule_index
+    index = get_route_index()
+    if index is None:
+        return None
+    if _schedule_index is None or _schedule_index[0] is not index:
+        _schedule_index = (index, ScheduleIndex(index.records))
+    return _schedule_index[1]
+
+
+def _route_box(x: float, y: float, radius_ft: int) -> Box:
+    # ~0.000003 degrees/ft at LA's latitude
+    deg_offset = radius_ft * 0.000003
+    return (x - deg_offset, y - deg_offset, x + deg_offset, y + deg_offset)
+
+
+def _tile_key(x: float, y: float) -> tuple[int, int]:
+    return (math.floor(x / TILE_DEG), math.floor(y / TILE_DEG))
+
+
+def _tile_box(tile: tuple[int, int]) -> Box:
+    """A tile's grid cell plus a halo of the widest search radius all round."""
+    ix, iy = tile
+    halo = max(SEARCH_RADII_FT) * 0.000003
+    return (
+        ix * TILE_DEG - halo,
+        iy * TILE_DEG - halo,
+        (ix + 1) * TILE_DEG + halo,
+        (iy + 1) * TILE_DEG + halo,
+    )
+
+
+async def query_sweep_routes(
+    x: float, y: float, radius_ft: int = 200
+) -> list[RouteRecord]:
+    """
+    Spatial query: find sweep routes within `radius_ft` feet of a point
+    (at most the widest of SEARCH_RADII_FT). Returns RouteRecords, nearest
+    centerline first.
+
+    Answers from the local replica when one has been synced; otherwise from
+    the point's route tile, fetched from the FeatureServer on a miss. Uses
+    an envelope (bounding box) because this FeatureServer rejects the
+    `units` param needed for point-buffer queries.
+    """
+    [index] = await _route_indexes([(x, y)], radius_ft)
+    if index is None:
         return []
+    box = _route_box(x, y, radius_ft)
+    return index.query_envelope(box, limit=ROUTE_LIMIT, near=(x, y))
 
-    features = data.get("features", [])
-    result = [f["attributes"] for f in features]
-    _routes_cache[cache_key] = result
-    return result
+
+async def query_nearest_routes(x: float, y: float) -> list[RouteRecord]:
+    """
+    Routes within the nearest of SEARCH_RADII_FT that has any (200 ft, else
+    500 ft), all answered from the same replica or tile.
+    """
+    [index] = await _route_indexes([(x, y)])
+    if index is None:
+        return []
+    for radius in SEARCH_RADII_FT:
+        box = _route_box(x, y, radius)
+        if routes := index.query_envelope(box, limit=ROUTE_LIMIT, near=(x, y)):
+            return routes
+    return []
+
+
+async def prefetch_sweep_routes(points: Sequence[tuple[float, float]]) -> None:
+    """Warm the route tiles for many points, in as few queries as possible."""
+    await _route_indexes(points)
+
+
+async def _route_indexes(
+    points: Sequence[tuple[float, float]], radius_ft: int | None = None
+) -> list[RouteIndex | None]:
+    """
+    The index to answer each point from: the replica, or else the point's
+    tile (None if its fetch failed). A tile another call is already loading
+    is awaited, not fetched again; the rest are fetched together,
+    TILES_PER_QUERY per request.
+    """
+    index = get_route_index()
+    if index is not None:
+        return [index] * len(points)
+    if radius_ft is not None and radius_ft > max(SEARCH_RADII_FT):
+        raise ValueError(f"radius_ft {radius_ft} is wider than the tile halo")
+
+    tiles = [_tile_key(x, y) for x, y in points]
+    found: dict[tuple[int, int], RouteIndex | None] = {}
+    waiting: dict[tuple[int, int], asyncio.Future[RouteIndex | None]] = {}
+    claimed: dict[tuple[int, int], asyncio.Future[RouteIndex | None]] = {}
+    # No await until every tile is found, joined or claimed, so a prefetch
+    # started just before a lookup claims the tiles they share
+    loop = asyncio.get_running_loop()
+    for tile in dict.fromkeys(tiles):
+        if tile in _tile_cache:
+            logger.info(f"Routes tile cache hit: {tile}")
+            found[tile] = _tile_cache[tile]
+        elif tile in _tile_inflight:
+            coalesce_stats["routes"] += 1
+            waiting[tile] = _tile_inflight[tile]
+        else:
+            waiting[tile] = claimed[tile] = _tile_inflight[tile] = loop.create_future()
+
+    if claimed:
+        # A task, so a cancelled caller doesn't strand the tiles it claimed
+        task = asyncio.ensure_future(_load_tiles(claimed))
+        _tile_loads.add(task)
+        task.add_done_callback(_tile_loads.discard)
+    if waiting:
+        indexes = await asyncio.gather(*map(asyncio.shield, waiting.values()))
+        found.update(zip(waiting, indexes))
+    return [found[tile] for tile in tiles]
+
+
+async def _load_tiles(
+    claimed: dict[tuple[int, int], asyncio.Future[RouteIndex | None]],
+) -> None:
+    """
+    Resolve claimed tiles' futures: from the disk cache, else fetched
+    TILES_PER_QUERY per request, each chunk as soon as its query returns.
+    """
+
+    def resolve(tile: tuple[int, int], index: RouteIndex | None) -> None:
+        fut = claimed[tile]
+        if _tile_inflight.get(tile) is fut:
+            del _tile_inflight[tile]
+        if not fut.done():
+            fut.set_result(index)
+
+    async def fetch(chunk: tuple[tuple[int, int], ...]) -> None:
+        indexes = await _fetch_tiles(chunk)
+        for tile in chunk:
+            resolve(tile, indexes.get(tile))
+
+    try:
+        misses = []
+        for tile in claimed:
+            cached = await _cached_tile(tile)
+            if cached is not None:
+                resolve(tile, cached)
+            else:
+                misses.append(tile)
+        await asyncio.gather(
+            *(
+                fetch(tuple(misses[i : i + TILES_PER_QUERY]))
+                for i in range(0, len(misses), TILES_PER_QUERY)
+            )
+        )
+    except Exception:
+        logger.exception("Loading route tiles failed")
+    finally:
+        for tile in claimed:
+            resolve(tile, None)
+
+
+async def _cached_tile(tile: tuple[int, int]) -> RouteIndex | None:
+    """Disk cache lookup for a route tile (into memory); None on a miss."""
+    cached = await cache_get("route_tiles", ",".join(map(str, tile)))
+    if cached is not MISS:
+        logger.info(f"Routes tile disk cache hit: {tile}")
+        _tile_cache[tile] = RouteIndex(cached)
+        return _tile_cache[tile]
+    return None
+
+
+async def _fetch_tiles(
+    tiles: tuple[tuple[int, int], ...],
+) -> dict[tuple[int, int], RouteIndex]:
+    """
+    One query for several tiles: their boxes (overlaps merged) go up as the
+    rings of a single polygon, geometry comes back, and each feature joins
+    every tile it intersects. Fills the caches; returns {} if the query fails.
+    """
+    boxes = {tile: _tile_box(tile) for tile in tiles}
+    rings = [
+        [[x0, y0], [x0, y1], [x1, y1], [x1, y0], [x0, y0]]
+        for x0, y0, x1, y1 in merge_boxes(list(boxes.values()))
+    ]
+    features: dict[tuple[int, int], list[dict]] = {tile: [] for tile in tiles}
+    offset = 0
+    while True:
+        data = {
+            "f": "json",
+            "geometry": json.dumps(
+                {"rings": rings, "spatialReference": {"wkid": 4326}}
+            ),
+            "geometryType": "esriGeometryPolygon",
+            "inSR": "4326",
+            "spatialRel": "esriSpatialRelIntersects",
+            "outFields": ROUTE_FIELDS,
+            "returnGeometry": "true",
+            "outSR": "4326",
+            "geometryPrecision": 6,
+            "orderByFields": "OBJECTID",
+            "resultOffset": offset,
+        }
+        try:
+            # POST: the polygon is too long for a query string
+            resp = await get_http_client().post(ROUTES_URL, data=data)
+            payload = resp.json()
+        except (httpx.HTTPError, ValueError):
+            logger.exception("Routes tile query failed")
+            return {}
+        if "error" in payload:
+            logger.error(f"ArcGIS query error: {payload['error']}")
+            return {}
+
+        page = payload.get("features", [])
+        for f in page:
+            paths = (f.get("geometry") or {}).get("paths")
+            if not paths:
+                continue
+            bbox = paths_bbox(paths)
+            for tile, box in boxes.items():
+                if boxes_intersect(bbox, box) and paths_intersect_box(paths, box):
+                    features[tile].append(
+                        {"attributes": f["attributes"], "paths": paths}
+                    )
+
+        if not page or not payload.get("exceededTransferLimit"):
+            break
+        offset += len(page)
+
+    indexes = {}
+    for tile, tile_features in features.items():
+        indexes[tile] = _tile_cache[tile] = RouteIndex(tile_features)
+        cache_put("route_tiles", ",".join(map(str, tile)), tile_features, ROUTES_TTL)
+    logger.info(f"Fetched {len(tiles)} route tile(s)")
+    return indexes
 
 
 # ---------------------------------------------------------------------------
 # Schedule logic
 # ---------------------------------------------------------------------------
 
-DAY_NUM = {"Monday": 0, "Tuesday": 1, "Wednesday": 2, "Thursday": 3, "Friday": 4}
-
-# Official 2026 sweep week calendar — from LA StreetsLA PDF
-# https://streets.lacity.gov/sites/default/files/2025-12/Sweeping2026.pdf
-# Each month has exactly 4 posted sweep weeks starting on the first full
-# Monday-Friday row. Partial weeks at month edges are non-posted.
-# Week 1 & 3 match "1st & 3rd" schedule, week 2 & 4 match "2nd & 4th".
-_SWEEP_MONDAYS_2026 = [
-    # January
-    (date(2026, 1, 5), 1),
-    (date(2026, 1, 12), 2),
-    (date(2026, 1, 19), 3),
-    (date(2026, 1, 26), 4),
-    # February
-    (date(2026, 2, 2), 1),
-    (date(2026, 2, 9), 2),
-    (date(2026, 2, 16), 3),
-    (date(2026, 2, 23), 4),
-    # March
-    (date(2026, 3, 2), 1),
-    (date(2026, 3, 9), 2),
-    (date(2026, 3, 16), 3),
-    (date(2026, 3, 23), 4),
-    # April
-    (date(2026, 4, 6), 1),
-    (date(2026, 4, 13), 2),
-    (date(2026, 4, 20), 3),
-    (date(2026, 4, 27), 4),
-    # May
-    (date(2026, 5, 4), 1),
-    (date(2026, 5, 11), 2),
-    (date(2026, 5, 18), 3),
-    (date(2026, 5, 25), 4),
-    # June
-    (date(2026, 6, 1), 1),
-    (date(2026, 6, 8), 2),
-    (date(2026, 6, 15), 3),
-    (date(2026, 6, 22), 4),
-    # July
-    (date(2026, 7, 6), 1),
-    (date(2026, 7, 13), 2),
-    (date(2026, 7, 20), 3),
-    (date(2026, 7, 27), 4),
-    # August
-    (date(2026, 8, 3), 1),
-    (date(2026, 8, 10), 2),
-    (date(2026, 8, 17), 3),
-    (date(2026, 8, 24), 4),
-    # September
-    (date(2026, 9, 7), 1),
-    (date(2026, 9, 14), 2),
-    (date(2026, 9, 21), 3),
-    (date(2026, 9, 28), 4),
-    # October
-    (date(2026, 10, 5), 1),
-    (date(2026, 10, 12), 2),
-    (date(2026, 10, 19), 3),
-    (date(2026, 10, 26), 4),
-    # November
-    (date(2026, 11, 2), 1),
-    (date(2026, 11, 9), 2),
-    (date(2026, 11, 16), 3),
-    (date(2026, 11, 23), 4),
-    # December
-    (date(2026, 12, 7), 1),
-    (date(2026, 12, 14), 2),
-    (date(2026, 12, 21), 3),
-    (date(2026, 12, 28), 4),
-]
-
-# Build lookup: date → sweep week number (1-4)
-# Dates absent from this dict are non-posted (no sweeping on posted routes)
-SWEEP_WEEK_2026: dict[date, int] = {}
-for _monday, _week in _SWEEP_MONDAYS_2026:
-    for _offset in range(5):  # Mon through Fri
-        SWEEP_WEEK_2026[_monday + timedelta(days=_offset)] = _week
-
-
-def _valid_weeks(schedule: str) -> set[int]:
-    """Parse a schedule string like '1 & 3' or '2 & 4' into valid week numbers."""
-    if "1" in schedule and "3" in schedule:
-        return {1, 3}
-    if "2" in schedule and "4" in schedule:
-        return {2, 4}
-    return {1, 2, 3, 4}
+# Posted weeks and holidays are generated per year on first use — see
+# sweep_calendar for the rules.
+SWEEP_CALENDAR = SweepCalendar()
 
 
 def next_sweep_dates(sweep_day_name: str, schedule: str, count: int = 3) -> list[date]:
     """
     Given a weekday name and schedule like '1st & 3rd' or '2nd & 4th',
-    return the next `count` sweep dates using the official 2026 calendar.
+    return the next `count` sweep dates from the posted sweep calendar.
     """
-    target_dow = DAY_NUM.get(sweep_day_name)
-    if target_dow is None:
-        return []
+    today = datetime.now(LA_TZ).date()
+    return SWEEP_CALENDAR.next_dates(sweep_day_name, schedule, today, count)
 
-    valid = _valid_weeks(schedule)
 
+def next_sweep_dates_batch(
+    pairs: Iterable[tuple[str, str]], count: int = 3
+) -> dict[tuple[str, str], list[date]]:
+    """next_sweep_dates for many (weekday name, schedule) pairs in one call."""
     today = datetime.now(LA_TZ).date()
-    results = []
-    d = today
-    for _ in range(120):
-        if d.weekday() == target_dow:
-            week = SWEEP_WEEK_2026.get(d)
-            if week in valid and d not in HOLIDAYS_2026:
-                if d >= today:
-                    results.append(d)
-                    if len(results) >= count:
-                        break
-        d += timedelta(days=1)
-    return results
+    return SWEEP_CALENDAR.next_dates_batch(pairs, today, count)
 
 
 def is_sweep_today(sweep_day_name: str, schedule: str) -> bool:
     """Check if sweeping is happening today."""
     today = datetime.now(LA_TZ).date()
-    if today in HOLIDAYS_2026:
-        return False
-    if today.strftime("%A") != sweep_day_name:
-        return False
-    week = SWEEP_WEEK_2026.get(today)
-    if week is None:
-        return False
-    return week in _valid_weeks(schedule)
+    return SWEEP_CALENDAR.is_sweep_day(today, sweep_day_name, schedule)
+
+
+def parse_sweep_date(text: str, today: date) -> date | None:
+    """'today', 'tomorrow' or an ISO date; None if it's none of those."""
+    text = text.strip().lower()
+    if text in ("", "tomorrow"):
+        return today + timedelta(days=1)
+    if text == "today":
+        return today
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def streets_sweeping(d: date, street: str = "") -> list[StreetSegment] | None:
+    """
+    Street segments swept on `d`, optionally only streets containing
+    `street`. None when there's no routes replica to answer from.
+    """
+    index = get_schedule_index()
+    if index is None:
+        return None
+    segments = index.sweeping_on(d)
+    if street := " ".join(street.upper().split()):
+        segments = [s for s in segments if street in s.street]
+    return segments
 
 
 # ---------------------------------------------------------------------------
@@ -337,10 +778,8 @@ def format_street_summary(details: dict) -> str:
         sweep_today = any(is_sweep_today(d, schedule) for d in days)
         if sweep_today:
             lines.append("\n⚠️ *SWEEPING TODAY — MOVE YOUR CAR!*")
-        all_dates: list[date] = []
-        for d in days:
-            all_dates.extend(next_sweep_dates(d, schedule, count=3))
-        all_dates.sort()
+        by_day = next_sweep_dates_batch(((d, schedule) for d in days), count=3)
+        all_dates = sorted(d for dates in by_day.values() for d in dates)
         if all_dates:
             dates_str = ", ".join(d.strftime("%a %b %-d") for d in all_dates[:4])
             lines.append(f"\n📆 Next: {dates_str}")
@@ -348,33 +787,55 @@ def format_street_summary(details: dict) -> str:
     return "\n".join(lines)
 
 
+# Rendered cards keyed by (LA date, street, days, schedule, times). A card only
+# changes with the date, so the whole cache is dropped at LA midnight.
+_card_cache: LRUCache[tuple, str] = LRUCache(maxsize=4096)
+_card_cache_day: date | None = None
+
+
+def street_card(details: dict) -> str:
+    """format_street_summary, rendered once per street schedule per LA day."""
+    global _card_cache_day
+    today = datetime.now(LA_TZ).date()
+    if today != _card_cache_day:
+        _card_cache.clear()
+        _card_cache_day = today
+    key = (
+        today,
+        details["street_name"],
+        tuple(details["sweep_days"]),
+        details["sweep_schedule"],
+        details["sweep_time"],
+    )
+    card = _card_cache.get(key)
+    if card is None:
+        card = _card_cache[key] = format_street_summary(details)
+    return card
+
+
 async def get_sweep_details(x: float, y: float) -> dict:
     """Coords → filtered routes → structured details dict."""
-    raw_routes = await query_sweep_routes(x, y, radius_ft=200)
-    if not raw_routes:
-        raw_routes = await query_sweep_routes(x, y, radius_ft=500)
+    raw_routes = await query_nearest_routes(x, y)
 
-    routes = [r for r in raw_routes if r.get("Posted_Day")]
+    routes = [r for r in raw_routes if r.posted_day]
 
     if routes:
-        street_counts = Counter(r.get("STNAME", "") for r in routes)
-        primary_street = street_counts.most_common(1)[0][0]
-        routes = [r for r in routes if r.get("STNAME") == primary_street]
+        # Routes come nearest-first: the point sits on the first one's street
+        primary_street = routes[0].stname
+        routes = [r for r in routes if r.stname == primary_street]
 
     if not routes:
         return {"found": False}
 
     first = routes[0]
     days: list[str] = list(
-        dict.fromkeys(d for r in routes if isinstance(d := r.get("Posted_Day"), str))
+        dict.fromkeys(d for r in routes if isinstance(d := r.posted_day, str))
     )
     times: list[str] = list(
-        dict.fromkeys(t for r in routes if isinstance(t := r.get("Posted_Time"), str))
+        dict.fromkeys(t for r in routes if isinstance(t := r.posted_time, str))
     )
-    street = " ".join(
-        filter(None, [first.get("STNAME", ""), first.get("STSFX", "")])
-    ).upper()
-    schedule = first.get("Weeks", "")
+    street = " ".join(filter(None, [first.stname, first.stsfx])).upper()
+    schedule = first.weeks or ""
 
     return {
         "found": True,
@@ -398,7 +859,7 @@ async def lookup_sweep_info(x: float, y: float) -> dict:
                 "outside the City of LA."
             ),
         }
-    return {"found": True, "text": format_street_summary(details)}
+    return {"found": True, "text": street_card(details)}
 
 
 # ---------------------------------------------------------------------------
@@ -411,7 +872,8 @@ HELP_TEXT = (
     "*Look up:*\n"
     "• `/sweep 1234 Main St, Los Angeles`\n"
     "• Just type an address\n"
-    "• Or share your 📍 location!\n\n"
+    "• Or share your 📍 location!\n"
+    "• `/streets tomorrow [street]` — what's swept on a date\n\n"
     "*Notifications:*\n"
     "• `/subscribe 1234 Main St` — get alerts before sweeping\n"
     "• `/mysubs` — see your subscriptions\n"
@@ -523,6 +985,48 @@ async def _lookup_coords(update: Update, x: float, y: float, label: str) -> None
     )
 
 
+# Telegram's limit is 4096 characters; leave room for the header and footer
+STREETS_TEXT_MAX = 3500
+
+
+async def handle_streets(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /streets [today|tomorrow|YYYY-MM-DD] [street] — list swept streets."""
+    if not update.message:
+        return
+    args = list(context.args or [])
+    today = datetime.now(LA_TZ).date()
+    d = parse_sweep_date(args[0], today) if args else today + timedelta(days=1)
+    if d is None:
+        # No date given, only a street filter
+        d = today + timedelta(days=1)
+    else:
+        args = args[1:]
+    street = " ".join(args)
+
+    segments = streets_sweeping(d, street)
+    if segments is None:
+        await update.message.reply_text("Street listings aren't available right now.")
+        return
+    when = d.strftime("%a %b %-d")
+    if not segments:
+        await update.message.reply_text(f"🧹 No posted sweeping on {when}.")
+        return
+
+    lines = [f"🧹 {len(segments)} street segment(s) swept on {when}"]
+    size = len(lines[0])
+    for shown, seg in enumerate(segments):
+        line = f"• {seg.street}" + (f" — {seg.boundaries}" if seg.boundaries else "")
+        if size + len(line) > STREETS_TEXT_MAX:
+            lines.append(
+                f"…and {len(segments) - shown} more. Narrow it down with a "
+                f"street name, e.g. /streets {d.isoformat()} main"
+            )
+            break
+        lines.append(line)
+        size += len(line) + 1
+    await update.message.reply_text("\n".join(lines))
+
+
 # ---------------------------------------------------------------------------
 # Subscription handlers
 # ---------------------------------------------------------------------------
@@ -600,19 +1104,18 @@ async def handle_mysubs(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
     lines = ["📋 Your Subscriptions\n"]
     for i, sub in enumerate(subs, 1):
-        sweep_days = json.loads(sub["sweep_days"])
-        days_str = " & ".join(sweep_days)
+        days_str = " & ".join(sub.sweep_days)
 
         # Compute next sweep date
-        all_dates: list[date] = []
-        for day_name in sweep_days:
-            all_dates.extend(next_sweep_dates(day_name, sub["sweep_schedule"], count=1))
-        all_dates.sort()
+        by_day = next_sweep_dates_batch(
+            ((d, sub.sweep_schedule) for d in sub.sweep_days), count=1
+        )
+        all_dates = sorted(d for dates in by_day.values() for d in dates)
         next_date = all_dates[0].strftime("%a %b %-d") if all_dates else "—"
 
         lines.append(
-            f"{i}. 📍 {sub['label']}\n"
-            f"   🧹 {sub['street_name'] or '—'} — {days_str} ({sub['sweep_schedule']})\n"
+            f"{i}. 📍 {sub.label}\n"
+            f"   🧹 {sub.street_name or '—'} — {days_str} ({sub.sweep_schedule})\n"
             f"   📆 Next: {next_date}"
         )
 
@@ -648,9 +1151,9 @@ async def handle_unsubscribe(
             )
             return
         sub = subs[pos - 1]
-        await remove_subscription(chat_id, sub["id"])
+        await remove_subscription(chat_id, sub.id)
         await update.message.reply_text(
-            f"✅ Unsubscribed from sweep alerts for {sub['label']}."
+            f"✅ Unsubscribed from sweep alerts for {sub.label}."
         )
         return
 
@@ -669,66 +1172,145 @@ async def handle_unsubscribe(
 # ---------------------------------------------------------------------------
 
 
+def _due_sweeps(codes: list[int], today: date) -> list[tuple[date, int] | None]:
+    """
+    For each schedule code, (sweep date, days away) if a sweep is 1 or 2 days
+    out, else None. 1-day takes priority. Each date is one sweep_day_mask call
+    over all the codes.
+    """
+    tomorrow = today + timedelta(days=1)
+    after = today + timedelta(days=2)
+    return [
+        (tomorrow, 1) if one else (after, 2) if two else None
+        for one, two in zip(
+            sweep_day_mask(codes, tomorrow), sweep_day_mask(codes, after)
+        )
+    ]
+
+
+def plan_notifications(
+    subs: Iterable[Subscription],
+    today: date,
+    memo: dict[int, tuple[date, int] | None] | None = None,
+) -> list[tuple[Subscription, date, int]]:
+    """
+    Group subscriptions by schedule code and work out every group's due sweep
+    in one batch. Returns (sub, sweep date, days away) for subs that need an
+    alert. Pass the same `memo` across calls to share that work between batches.
+    """
+    groups: dict[int, list[Subscription]] = defaultdict(list)
+    for sub in subs:
+        groups[sub.code].append(sub)
+
+    if memo is None:
+        memo = {}
+    pending = [code for code in groups if code not in memo]
+    if pending:
+        memo.update(zip(pending, _due_sweeps(pending, today)))
+    plan = []
+    for code, members in groups.items():
+        due = memo[code]
+        if due:
+            plan.extend((sub, *due) for sub in members)
+    return plan
+
+
+def _format_alert(sub: Subscription, sweep_date: date, days_away: int) -> str:
+    if days_away == 1:
+        return (
+            f"⚠️ Sweep TOMORROW!\n"
+            f"📍 {sub.label}\n"
+            f"🧹 {sub.street_name or 'Your street'}\n"
+            f"📅 {sweep_date.strftime('%A %b %-d')}\n"
+            f"🕐 {sub.sweep_time or 'Check posted signs'}\n\n"
+            f"Move your car tonight!"
+        )
+    return (
+        f"📋 Sweep in 2 days\n"
+        f"📍 {sub.label}\n"
+        f"🧹 {sub.street_name or 'Your street'}\n"
+        f"📅 {sweep_date.strftime('%A %b %-d')}\n"
+        f"🕐 {sub.sweep_time or 'Check posted signs'}"
+    )
+
+
+def build_digests(
+    plan: list[tuple[Subscription, date, int]],
+) -> list[tuple[int, str]]:
+    """
+    One message per chat: all of its due alerts, 1-day warnings first, then
+    by sweep date. Returns (chat_id, text) pairs.
+    """
+    by_chat: dict[int, list[tuple[Subscription, date, int]]] = defaultdict(list)
+    for entry in plan:
+        by_chat[entry[0].chat_id].append(entry)
+
+    digests = []
+    for chat_id, alerts in by_chat.items():
+        alerts.sort(key=lambda a: (a[2], a[1], a[0].id))
+        text = "\n\n".join(_format_alert(*alert) for alert in alerts)
+        digests.append((chat_id, text))
+    return digests
+
+
+async def _digest_stream(
+    subs: AsyncIterator[Subscription], today: date
+) -> AsyncIterator[tuple[int, str]]:
+    """Plan and digest a chat_id-ordered subscription stream one chat at a time."""
+    memo: dict[int, tuple[date, int] | None] = {}
+    chat_subs: list[Subscription] = []
+    async for sub in subs:
+        if chat_subs and sub.chat_id != chat_subs[0].chat_id:
+            for digest in build_digests(plan_notifications(chat_subs, today, memo)):
+                yield digest
+            chat_subs = []
+        chat_subs.append(sub)
+    if chat_subs:
+        for digest in build_digests(plan_notifications(chat_subs, today, memo)):
+            yield digest
+
+
 async def send_notifications(context: ContextTypes.DEFAULT_TYPE) -> None:
     """Daily job: send 2-day and 1-day sweep warnings to subscribers."""
     today = datetime.now(LA_TZ).date()
-    tomorrow = today + timedelta(days=1)
-    day_after = today + timedelta(days=2)
 
-    all_subs = await get_all_subscriptions()
-    logger.info(f"Notification check: {len(all_subs)} subscription(s)")
+    # Nothing in the whole routes layer sweeps in 1-2 days (holiday,
+    # non-posted week): skip the run without touching the DB
+    index = get_schedule_index()
+    if index is not None and not any(
+        index.active_codes(today + timedelta(days=n)) for n in (1, 2)
+    ):
+        logger.info("Notification check: no schedule bucket active, skipping")
+        return
 
-    blocked_chats: set[int] = set()
-    for sub in all_subs:
-        if sub["chat_id"] in blocked_chats:
-            continue
-        sweep_days = json.loads(sub["sweep_days"])
-        schedule = sub["sweep_schedule"]
-
-        # Collect upcoming dates across all sweep days for this subscription
-        upcoming: list[date] = []
-        for day_name in sweep_days:
-            upcoming.extend(next_sweep_dates(day_name, schedule, count=2))
-
-        # Check for 1-day or 2-day warning (1-day takes priority)
-        msg = None
-        for sweep_date in sorted(upcoming):
-            if sweep_date == tomorrow:
-                msg = (
-                    f"⚠️ Sweep TOMORROW!\n"
-                    f"📍 {sub['label']}\n"
-                    f"🧹 {sub['street_name'] or 'Your street'}\n"
-                    f"📅 {sweep_date.strftime('%A %b %-d')}\n"
-                    f"🕐 {sub['sweep_time'] or 'Check posted signs'}\n\n"
-                    f"Move your car tonight!"
-                )
-                break
-            elif sweep_date == day_after:
-                msg = (
-                    f"📋 Sweep in 2 days\n"
-                    f"📍 {sub['label']}\n"
-                    f"🧹 {sub['street_name'] or 'Your street'}\n"
-                    f"📅 {sweep_date.strftime('%A %b %-d')}\n"
-                    f"🕐 {sub['sweep_time'] or 'Check posted signs'}"
-                )
-                # Don't break — a closer (tomorrow) date may appear next
-
-        if msg:
-            try:
-                await context.bot.send_message(chat_id=sub["chat_id"], text=msg)
-            except Forbidden:
-                logger.info(
-                    f"User {sub['chat_id']} blocked bot, removing subscriptions"
-                )
-                blocked_chats.add(sub["chat_id"])
-                await remove_all_subscriptions(sub["chat_id"])
-            except Exception:
-                logger.exception(f"Failed to send notification to {sub['chat_id']}")
+    # Only read subscriptions whose (day, schedule) sweeps in 1-2 days
+    pairs = await get_schedule_pairs()
+    codes = [schedule_code(days_to_mask([day]), sched) for day, sched in pairs]
+    due_pairs = [p for p, due in zip(pairs, _due_sweeps(codes, today)) if due]
+    logger.info(f"Notification check: {len(due_pairs)}/{len(pairs)} schedule(s) due")
+
+    # Rows stream from SQLite through the planner into the send queue, so
+    # memory stays flat however many subscribers there are
+    sender = NotificationSender(context.bot)
+    stats = await sender.send_all(_digest_stream(iter_subscriptions(due_pairs), today))
+    logger.info(f"Notifications done: {stats.summary()}")
+
+    # Purge users who blocked the bot in one transaction, after the sends
+    if sender.blocked_chats:
+        removed = await remove_subscriptions_for_chats(sender.blocked_chats)
+        logger.info(
+            f"Removed {removed} subscription(s) for "
+            f"{len(sender.blocked_chats)} blocked chat(s)"
+        )
 
 
 async def post_init(application: Application) -> None:
     """Called after Application.initialize() — set up DB and daily job."""
     await init_db()
+    await open_cache()
+    get_http_client()
+    get_route_index()
+    get_gazetteer()
     application.job_queue.run_daily(  # type: ignore[union-attr]
         send_notifications,
         time=dt_time(hour=7, minute=0, tzinfo=LA_TZ),
@@ -737,12 +1319,57 @@ async def post_init(application: Application) -> None:
     logger.info("Scheduled daily sweep notifications at 7:00 AM LA time")
 
 
+async def post_shutdown(application: Application) -> None:
+    """Called after Application.shutdown() — release pooled connections."""
+    await close_http_client()
+    await close_cache()
+    await close_db()
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
 
 
+async def sync_routes() -> None:
+    """Download the routes layer into the local replica."""
+    count = await sync_replica(ROUTES_URL, ROUTE_FIELDS, REPLICA_PATH)
+    logger.info(f"Wrote {count} route features to {REPLICA_PATH}")
+
+
+async def refresh_route_replica() -> None:
+    """
+    Sync the routes replica if it's missing or stale, then swap it in. For a
+    machine nobody runs sync-routes on (the web app's); lookups fall back to
+    route tiles meanwhile.
+    """
+    global _route_index, _route_index_loaded
+    index = get_route_index()
+    if index is not None and not index.is_stale():
+        return
+    try:
+        await sync_routes()
+        index = await asyncio.to_thread(load_replica, REPLICA_PATH)
+    except Exception:
+        logger.exception("Routes replica sync failed")
+        return
+    _route_index, _route_index_loaded = index, True
+
+
+def import_addresses(csv_path: str) -> None:
+    """Build the offline gazetteer from an address-points CSV."""
+    count = import_address_points(csv_path, GAZETTEER_PATH)
+    logger.info(f"Wrote {count} address points to {GAZETTEER_PATH}")
+
+
 def main() -> None:
+    if sys.argv[1:] == ["sync-routes"]:
+        asyncio.run(sync_routes())
+        return
+    if sys.argv[1:2] == ["import-addresses"] and len(sys.argv) == 3:
+        import_addresses(sys.argv[2])
+        return
+
     if BOT_TOKEN == "YOUR_BOT_TOKEN_HERE":
         print("=" * 60)
         print("Set your bot token!")
@@ -750,11 +1377,18 @@ def main() -> None:
         print("=" * 60)
         return
 
-    app = Application.builder().token(BOT_TOKEN).post_init(post_init).build()
+    app = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("help", start))
     app.add_handler(CommandHandler("sweep", handle_sweep))
+    app.add_handler(CommandHandler("streets", handle_streets))
     app.add_handler(CommandHandler("subscribe", handle_subscribe))
     app.add_handler(CommandHandler("mysubs", handle_mysubs))
     app.add_handler(CommandHandler("unsubscribe", handle_unsubscribe))
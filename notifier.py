@@ -0,0 +1,194 @@
+"""Rate-limited concurrent Telegram send pipeline for the daily notification job."""
+
+import asyncio
+import logging
+import random
+import statistics
+from collections.abc import AsyncIterable, Iterable
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from telegram import Bot
+from telegram.error import Forbidden, RetryAfter
+
+# Telegram allows ~30 messages/s across all chats and ~1 message/s per chat
+GLOBAL_RATE = 30.0
+PER_CHAT_INTERVAL = 1.0
+CONCURRENCY = 8
+MAX_RETRIES = 3
+# Latencies kept for the run summary's percentiles (a uniform sample)
+LATENCY_SAMPLE = 1024
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Spaces calls at least `interval` seconds apart (FIFO, no bursts)."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next = 0.0
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def pause(self, seconds: float) -> None:
+        """Push every future slot back by at least `seconds` (flood control)."""
+        now = asyncio.get_running_loop().time()
+        self._next = max(self._next, now + seconds)
+
+
+@dataclass
+class SendStats:
+    sent: int = 0
+    failed: int = 0
+    blocked: int = 0
+    retries: int = 0
+    elapsed: float = 0.0
+    # Seconds from the start of the run until delivery: a reservoir sample of
+    # at most LATENCY_SAMPLE messages, so a big run doesn't keep one per send
+    latencies: list[float] = field(default_factory=list)
+    max_latency: float = 0.0
+
+    def add_latency(self, seconds: float) -> None:
+        """Record a delivered message (call after counting it in `sent`)."""
+        self.max_latency = max(self.max_latency, seconds)
+        if len(self.latencies) < LATENCY_SAMPLE:
+            self.latencies.append(seconds)
+        elif (i := random.randrange(self.sent)) < LATENCY_SAMPLE:
+            self.latencies[i] = seconds
+
+    def summary(self) -> str:
+        rate = self.sent / self.elapsed if self.elapsed else 0.0
+        parts = [
+            f"sent={self.sent}",
+            f"failed={self.failed}",
+            f"blocked={self.blocked}",
+            f"retries={self.retries}",
+            f"elapsed={self.elapsed:.1f}s",
+            f"rate={rate:.1f}/s",
+        ]
+        if self.latencies:
+            ordered = sorted(self.latencies)
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            parts += [
+                f"p50={statistics.median(ordered):.1f}s",
+                f"p95={p95:.1f}s",
+                f"max={self.max_latency:.1f}s",
+            ]
+        return " ".join(parts)
+
+
+def _retry_seconds(exc: RetryAfter) -> float:
+    delay = exc.retry_after
+    if isinstance(delay, timedelta):
+        return delay.total_seconds()
+    return float(delay)
+
+
+class NotificationSender:
+    """
+    Sends (chat_id, text) messages with bounded concurrency while keeping
+    under Telegram's global and per-chat limits. RetryAfter pauses the whole
+    pipeline and the message is retried; Forbidden adds the chat to
+    `blocked_chats` so the caller can purge it once the run is over.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        concurrency: int = CONCURRENCY,
+        global_rate: float = GLOBAL_RATE,
+        per_chat_interval: float = PER_CHAT_INTERVAL,
+        max_retries: int = MAX_RETRIES,
+    ):
+        self.bot = bot
+        self.concurrency = concurrency
+        self.per_chat_interval = per_chat_interval
+        self.max_retries = max_retries
+        self._global = RateLimiter(1 / global_rate)
+        # Per-chat limiters, least recently used first (see _chat_limiter)
+        self._chats: dict[int, RateLimiter] = {}
+        self.blocked_chats: set[int] = set()
+        self.stats = SendStats()
+
+    async def send_all(
+        self, messages: Iterable[tuple[int, str]] | AsyncIterable[tuple[int, str]]
+    ) -> SendStats:
+        """Send every message; `messages` may be a lazy (async) stream."""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        # Bounded so a streaming producer stays only a little ahead of sends
+        queue: asyncio.Queue[tuple[int, str] | None] = asyncio.Queue(
+            maxsize=self.concurrency * 4
+        )
+
+        async def produce() -> None:
+            try:
+                if isinstance(messages, AsyncIterable):
+                    async for msg in messages:
+                        await queue.put(msg)
+                else:
+                    for msg in messages:
+                        await queue.put(msg)
+            finally:
+                for _ in range(self.concurrency):
+                    await queue.put(None)
+
+        async def worker() -> None:
+            while (msg := await queue.get()) is not None:
+                await self._send(*msg, started)
+
+        await asyncio.gather(produce(), *(worker() for _ in range(self.concurrency)))
+        self.stats.elapsed = loop.time() - started
+        return self.stats
+
+    def _chat_limiter(self, chat_id: int) -> RateLimiter:
+        """
+        `chat_id`'s limiter, moved to the back of `_chats`. Limiters whose
+        interval has passed are evicted from the front first: a fresh one
+        would allow the same next slot, and a run is one digest per chat, so
+        the dict stays as small as the chats sent to in the last interval.
+        """
+        now = asyncio.get_running_loop().time()
+        chat = self._chats.pop(chat_id, None) or RateLimiter(self.per_chat_interval)
+        while self._chats:
+            oldest = next(iter(self._chats))
+            if self._chats[oldest]._next > now:
+                break
+            del self._chats[oldest]
+        self._chats[chat_id] = chat
+        return chat
+
+    async def _send(self, chat_id: int, text: str, started: float) -> None:
+        for attempt in range(self.max_retries + 1):
+            if chat_id in self.blocked_chats:
+                return
+            await self._chat_limiter(chat_id).acquire()
+            await self._global.acquire()
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=text)
+            except RetryAfter as e:
+                delay = _retry_seconds(e)
+                logger.warning(f"Flood control hit, pausing sends for {delay:.0f}s")
+                self._global.pause(delay)
+                if attempt < self.max_retries:
+                    self.stats.retries += 1
+                    continue
+                self.stats.failed += 1
+            except Forbidden:
+                logger.info(f"User {chat_id} blocked bot")
+                self.blocked_chats.add(chat_id)
+                self.stats.blocked += 1
+            except Exception:
+                logger.exception(f"Failed to send notification to {chat_id}")
+                self.stats.failed += 1
+            else:
+                self.stats.sent += 1
+                self.stats.add_latency(asyncio.get_running_loop().time() - started)
+            return
@@ -0,0 +1,90 @@
+"""Compact immutable record types for subscriptions and sweep routes."""
+
+import json
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+from sweep_calendar import Schedule, days_to_mask, mask_to_days, schedule_code
+
+
+@dataclass(frozen=True, slots=True)
+class Subscription:
+    id: int
+    chat_id: int
+    x: float
+    y: float
+    label: str
+    days: int  # weekday bitmask, bit 0 = Monday
+    schedule: Schedule
+    sweep_schedule: str  # as posted, for display
+    sweep_time: str | None
+    street_name: str | None
+
+    @property
+    def sweep_days(self) -> tuple[str, ...]:
+        return mask_to_days(self.days)
+
+    @property
+    def code(self) -> int:
+        """Packed schedule code (see sweep_calendar.schedule_code)."""
+        return schedule_code(self.days, self.schedule)
+
+    @classmethod
+    def from_row(cls, row: Mapping) -> "Subscription":
+        """Build from a subscriptions table row, parsing sweep_days once."""
+        return cls(
+            id=row["id"],
+            chat_id=row["chat_id"],
+            x=row["x"],
+            y=row["y"],
+            label=row["label"],
+            days=days_to_mask(json.loads(row["sweep_days"])),
+            schedule=Schedule.parse(row["sweep_schedule"]),
+            sweep_schedule=row["sweep_schedule"],
+            sweep_time=row["sweep_time"],
+            street_name=row["street_name"],
+        )
+
+
+# ArcGIS field name → RouteRecord attribute
+ROUTE_ATTRIBUTES = {
+    "Route": "route",
+    "Posted_Day": "posted_day",
+    "Posted_Time": "posted_time",
+    "Boundaries": "boundaries",
+    "Weeks": "weeks",
+    "Day_Short": "day_short",
+    "STNAME": "stname",
+    "TDIR": "tdir",
+    "STSFX": "stsfx",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class RouteRecord:
+    """Sweep schedule attributes of one Clean_Street_Routes feature."""
+
+    route: str | None = None
+    posted_day: str | None = None
+    posted_time: str | None = None
+    boundaries: str | None = None
+    weeks: str | None = None
+    day_short: str | None = None
+    stname: str | None = None
+    tdir: str | None = None
+    stsfx: str | None = None
+
+    @classmethod
+    def from_attributes(cls, attributes: Mapping) -> "RouteRecord":
+        """Build from an ArcGIS feature's attributes dict."""
+        return cls(
+            **{name: attributes.get(field) for field, name in ROUTE_ATTRIBUTES.items()}
+        )
+
+    def to_attributes(self) -> dict:
+        """Back to ArcGIS field names (for JSON storage)."""
+        return {
+            field: value
+            for field, name in ROUTE_ATTRIBUTES.items()
+            if (value := getattr(self, name)) is not None
+        }
@@ -0,0 +1,353 @@
+"""Offline replica of the Clean_Street_Routes layer with an in-memory spatial index."""
+
+import asyncio
+import gzip
+import json
+import logging
+import math
+import os
+import time
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from itertools import chain, pairwise
+
+import httpx
+
+from records import RouteRecord
+
+REPLICA_PATH = os.environ.get("SWEEP_ROUTES_PATH", "routes.json.gz")
+
+# A replica older than this is still served, with a warning to re-sync
+REPLICA_MAX_AGE = 30 * 86_400  # 30 days
+
+# Fan-out of each R-tree node. 16 keeps the tree shallow (~4 levels for the
+# whole city) while each node's bbox scan stays cheap.
+NODE_CAPACITY = 16
+
+logger = logging.getLogger(__name__)
+
+Box = tuple[float, float, float, float]  # (xmin, ymin, xmax, ymax)
+Path = Sequence[Sequence[float]]  # [[x, y], ...]
+
+
+# ---------------------------------------------------------------------------
+# Geometry helpers
+# ---------------------------------------------------------------------------
+
+
+def paths_bbox(paths: list[Path]) -> Box:
+    """Bounding box of a polyline's paths."""
+    xs = [pt[0] for path in paths for pt in path]
+    ys = [pt[1] for path in paths for pt in path]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+def boxes_intersect(a: Box, b: Box) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def _segment_hits_box(x1: float, y1: float, x2: float, y2: float, box: Box) -> bool:
+    """Liang-Barsky clip: does the segment (x1,y1)-(x2,y2) touch `box`?"""
+    dx, dy = x2 - x1, y2 - y1
+    t0, t1 = 0.0, 1.0
+    for p, q in (
+        (-dx, x1 - box[0]),
+        (dx, box[2] - x1),
+        (-dy, y1 - box[1]),
+        (dy, box[3] - y1),
+    ):
+        if p == 0:
+            if q < 0:
+                return False
+            continue
+        t = q / p
+        if p < 0:
+            if t > t1:
+                return False
+            t0 = max(t0, t)
+        else:
+            if t < t0:
+                return False
+            t1 = min(t1, t)
+    return True
+
+
+def paths_intersect_box(paths: list[Path], box: Box) -> bool:
+    """Exact polyline/envelope intersection (what esriSpatialRelIntersects does)."""
+    for path in paths:
+        if len(path) == 1:
+            x, y = path[0]
+            if box[0] <= x <= box[2] and box[1] <= y <= box[3]:
+                return True
+        for (x1, y1), (x2, y2) in pairwise(path):
+            if _segment_hits_box(x1, y1, x2, y2, box):
+                return True
+    return False
+
+
+def paths_distance(paths: list[Path], x: float, y: float) -> float:
+    """
+    Distance from (x, y) to the nearest point of a polyline, in degrees of
+    latitude (longitude is scaled by cos(latitude), so it ranks true distance).
+    """
+    kx = math.cos(math.radians(y))
+    best = math.inf
+    for path in paths:
+        pts = [((px - x) * kx, py - y) for px, py in path]
+        if len(pts) == 1:
+            best = min(best, math.hypot(*pts[0]))
+        for (x1, y1), (x2, y2) in pairwise(pts):
+            dx, dy = x2 - x1, y2 - y1
+            length2 = dx * dx + dy * dy
+            # Projection of the origin onto the segment, clamped to its ends
+            t = 0.0 if length2 == 0 else -(x1 * dx + y1 * dy) / length2
+            t = max(0.0, min(1.0, t))
+            best = min(best, math.hypot(x1 + t * dx, y1 + t * dy))
+    return best
+
+
+def merge_boxes(boxes: list[Box]) -> list[Box]:
+    """Replace each group of overlapping boxes with its bounding box."""
+    merged: list[Box] = []
+    for box in boxes:
+        # A grown box can newly overlap earlier ones, so keep absorbing
+        while hit := [m for m in merged if boxes_intersect(m, box)]:
+            box = _union([box, *hit])
+            merged = [m for m in merged if m not in hit]
+        merged.append(box)
+    return merged
+
+
+# ---------------------------------------------------------------------------
+# STR-packed R-tree
+# ---------------------------------------------------------------------------
+
+# A node is (bbox, children); a child is a feature index at the leaf level
+# (its bbox is in RouteIndex's packed boxes) or a node above it.
+
+
+def _union(boxes: list[Box]) -> Box:
+    return (
+        min(b[0] for b in boxes),
+        min(b[1] for b in boxes),
+        max(b[2] for b in boxes),
+        max(b[3] for b in boxes),
+    )
+
+
+def _str_pack(entries: list[tuple[Box, object]], capacity: int) -> list[tuple]:
+    """One Sort-Tile-Recursive pass: group (bbox, child) entries into nodes."""
+    n_nodes = math.ceil(len(entries) / capacity)
+    n_slices = math.ceil(math.sqrt(n_nodes))
+    slice_size = n_slices * capacity
+
+    by_x = sorted(entries, key=lambda e: e[0][0] + e[0][2])
+    nodes = []
+    for i in range(0, len(by_x), slice_size):
+        by_y = sorted(by_x[i : i + slice_size], key=lambda e: e[0][1] + e[0][3])
+        for j in range(0, len(by_y), capacity):
+            group = by_y[j : j + capacity]
+            nodes.append((_union([box for box, _ in group]), [c for _, c in group]))
+    return nodes
+
+
+class RouteIndex:
+    """
+    Read-only R-tree over route features, bulk-loaded with STR packing.
+
+    Packed for the whole city's layer (~50k features): every vertex is two
+    doubles in one coordinates array, indexed by per-path and per-feature
+    offsets, bboxes are four doubles per feature, and equal records and
+    attribute strings are stored once. Paths are rebuilt as lists only for
+    the candidates a query tests.
+    """
+
+    def __init__(
+        self,
+        features: Iterable[dict],
+        capacity: int = NODE_CAPACITY,
+        synced_at: float | None = None,
+    ):
+        self.synced_at = synced_at
+        self.records: list[RouteRecord] = []
+        self._coords = array("d")  # x, y of every vertex
+        self._path_starts = array("I", [0])  # vertex offsets, one per path + 1
+        self._feature_paths = array("I", [0])  # path offsets, one per feature + 1
+        self._boxes = array("d")  # xmin, ymin, xmax, ymax per feature
+        records: dict[RouteRecord, RouteRecord] = {}
+        strings: dict[str, str] = {}
+        for f in features:
+            # Attribute values repeat across the layer ("Monday", route
+            # names), so each distinct string is kept once too
+            attributes = {
+                k: strings.setdefault(v, v) if isinstance(v, str) else v
+                for k, v in f["attributes"].items()
+            }
+            record = RouteRecord.from_attributes(attributes)
+            self.records.append(records.setdefault(record, record))
+            for path in f["paths"]:
+                self._coords.extend(chain.from_iterable(path))
+                self._path_starts.append(len(self._coords) // 2)
+            self._feature_paths.append(len(self._path_starts) - 1)
+            self._boxes.extend(paths_bbox(f["paths"]))
+
+        self._root: tuple | None = None
+        level: list[tuple] = [(self.box(i), i) for i in range(len(self.records))]
+        while level:
+            nodes = _str_pack(level, capacity)
+            if len(nodes) == 1:
+                self._root = nodes[0]
+                break
+            level = [(node[0], node) for node in nodes]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def is_stale(self) -> bool:
+        """True if older than REPLICA_MAX_AGE, or of unknown age."""
+        return self.synced_at is None or time.time() - self.synced_at > REPLICA_MAX_AGE
+
+    def box(self, i: int) -> Box:
+        """Feature `i`'s bbox."""
+        b = self._boxes
+        return (b[4 * i], b[4 * i + 1], b[4 * i + 2], b[4 * i + 3])
+
+    def paths(self, i: int) -> list[Path]:
+        """Feature `i`'s geometry, unpacked."""
+        c, starts = self._coords, self._path_starts
+        paths = []
+        for p in range(self._feature_paths[i], self._feature_paths[i + 1]):
+            lo, hi = 2 * starts[p], 2 * starts[p + 1]
+            paths.append(list(zip(c[lo:hi:2], c[lo + 1 : hi : 2])))
+        return paths
+
+    def search(self, box: Box) -> list[int]:
+        """Feature indices whose bbox intersects `box`, in feature order."""
+        if self._root is None or not boxes_intersect(self._root[0], box):
+            return []
+        b = self._boxes
+        xmin, ymin, xmax, ymax = box
+        hits = []
+        stack = [self._root[1]]
+        while stack:
+            for child in stack.pop():
+                if isinstance(child, int):
+                    j = 4 * child
+                    if (
+                        b[j] <= xmax
+                        and xmin <= b[j + 2]
+                        and b[j + 1] <= ymax
+                        and ymin <= b[j + 3]
+                    ):
+                        hits.append(child)
+                elif boxes_intersect(child[0], box):
+                    stack.append(child[1])
+        hits.sort()
+        return hits
+
+    def query_envelope(
+        self,
+        box: Box,
+        limit: int | None = None,
+        near: tuple[float, float] | None = None,
+    ) -> list[RouteRecord]:
+        """
+        Records of features whose geometry intersects `box`, in feature order
+        or, given `near`, nearest to that (x, y) first.
+        """
+        candidates = {i: self.paths(i) for i in self.search(box)}
+        hits = [i for i, paths in candidates.items() if paths_intersect_box(paths, box)]
+        if near is not None:
+            hits.sort(key=lambda i: paths_distance(candidates[i], *near))
+        return [self.records[i] for i in hits[:limit]]
+
+
+# ---------------------------------------------------------------------------
+# Sync + persistence
+# ---------------------------------------------------------------------------
+
+
+def iter_features(url: str, out_fields: str, page_size: int = 2000) -> Iterator[dict]:
+    """
+    Page through the whole layer, yielding {attributes, paths} dicts. Blocking
+    and one page at a time, so a sync holds a page in memory, not the layer.
+    """
+    offset = 0
+    with httpx.Client(timeout=60) as client:
+        while True:
+            params = {
+                "f": "json",
+                "where": "1=1",
+                "outFields": out_fields,
+                "returnGeometry": "true",
+                "outSR": "4326",
+                "geometryPrecision": 6,
+                "orderByFields": "OBJECTID",
+                "resultOffset": offset,
+                "resultRecordCount": page_size,
+            }
+            data = client.get(url, params=params).json()
+            if "error" in data:
+                raise RuntimeError(f"ArcGIS query error: {data['error']}")
+
+            page = data.get("features", [])
+            for f in page:
+                paths = (f.get("geometry") or {}).get("paths")
+                if paths:
+                    yield {"attributes": f["attributes"], "paths": paths}
+            logger.info(f"Synced {offset + len(page)} route features")
+
+            if not page or not data.get("exceededTransferLimit"):
+                break
+            offset += len(page)
+
+
+def save_replica(features: Iterable[dict], path: str = REPLICA_PATH) -> int:
+    """
+    Atomically write the replica as gzipped JSON lines: a {"synced_at"}
+    header, then one feature per line, so it loads without parsing the whole
+    layer at once. Returns the feature count.
+    """
+    tmp = f"{path}.tmp"
+    count = 0
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"synced_at": time.time()}) + "\n")
+        for feature in features:
+            f.write(json.dumps(feature) + "\n")
+            count += 1
+    os.replace(tmp, path)
+    return count
+
+
+def load_replica(path: str = REPLICA_PATH) -> RouteIndex | None:
+    """Load the replica and build its index. Returns None if not synced yet."""
+    if not os.path.exists(path):
+        return None
+    started = time.monotonic()
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(next(f, "{}"))
+        # Files from before the JSON-lines format hold every feature in one
+        # document
+        features = header.get("features") or map(json.loads, f)
+        index = RouteIndex(features, synced_at=header.get("synced_at"))
+    logger.info(
+        f"Loaded {len(index)} route features from {path} "
+        f"in {time.monotonic() - started:.1f}s"
+    )
+    if index.is_stale():
+        synced = (
+            time.ctime(index.synced_at) if index.synced_at else "at an unknown time"
+        )
+        logger.warning(
+            f"Routes replica {path} was synced {synced}; "
+            "run `python la_sweep_bot.py sync-routes` to refresh it"
+        )
+    return index
+
+
+async def sync_replica(url: str, out_fields: str, path: str = REPLICA_PATH) -> int:
+    """
+    Download the full layer into the local replica, streamed page by page
+    in a worker thread. Returns feature count.
+    """
+    return await asyncio.to_thread(save_replica, iter_features(url, out_fields), path)
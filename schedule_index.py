@@ -0,0 +1,75 @@
+"""Inverted index from sweep schedule to street segments.
+
+Built from the routes replica (route_index.py): every feature's
+(Posted_Day, Weeks) packs into one schedule code (sweep_calendar), and each
+code maps to its routes and their street segments. "Which streets sweep on
+this date" is then the handful of codes that match the date, not a spatial
+query per street.
+"""
+
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import date
+
+from records import RouteRecord
+from sweep_calendar import code_matches, date_code, days_to_mask, schedule_code
+
+
+@dataclass(frozen=True, slots=True)
+class StreetSegment:
+    """One posted stretch of a street on a sweep route."""
+
+    street: str
+    route: str | None
+    boundaries: str | None
+    posted_time: str | None
+
+    @property
+    def sort_key(self) -> tuple[str, str, str]:
+        return (self.street, self.route or "", self.boundaries or "")
+
+
+def _street(record: RouteRecord) -> str:
+    return " ".join(filter(None, [record.stname, record.stsfx])).upper()
+
+
+class ScheduleIndex:
+    """Schedule code → route → street segments (deduplicated, sorted)."""
+
+    def __init__(self, records: Iterable[RouteRecord]):
+        buckets: defaultdict[int, defaultdict[str, set[StreetSegment]]] = defaultdict(
+            lambda: defaultdict(set)
+        )
+        for r in records:
+            days = days_to_mask([r.posted_day]) if r.posted_day else 0
+            if not days:
+                continue
+            segment = StreetSegment(_street(r), r.route, r.boundaries, r.posted_time)
+            buckets[schedule_code(days, r.weeks or "")][r.route or ""].add(segment)
+        self.routes: dict[int, dict[str, list[StreetSegment]]] = {
+            code: {
+                route: sorted(segments, key=lambda s: s.sort_key)
+                for route, segments in sorted(by_route.items())
+            }
+            for code, by_route in buckets.items()
+        }
+
+    def __len__(self) -> int:
+        return sum(
+            len(s) for by_route in self.routes.values() for s in by_route.values()
+        )
+
+    def segments(self, code: int) -> list[StreetSegment]:
+        """Every segment posted with schedule code `code`."""
+        return [s for segments in self.routes.get(code, {}).values() for s in segments]
+
+    def active_codes(self, d: date) -> list[int]:
+        """The schedule codes (buckets) that sweep on `d`."""
+        day = date_code(d)
+        return [code for code in self.routes if code_matches(code, day)]
+
+    def sweeping_on(self, d: date) -> list[StreetSegment]:
+        """Every segment swept on `d`, by street name."""
+        found = [s for code in self.active_codes(d) for s in self.segments(code)]
+        return sorted(found, key=lambda s: s.sort_key)
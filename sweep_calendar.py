@@ -0,0 +1,244 @@
+"""Rule-based sweep calendar with precomputed dates per (weekday, week-set).
+
+StreetsLA posts four sweep weeks per month, starting on the first full
+Monday-Friday row; partial weeks at month edges are non-posted. Week 1 & 3
+match the "1st & 3rd" schedule, week 2 & 4 match "2nd & 4th". Enforcement is
+suspended on city holidays. Both are derived here for any year, so the
+calendar no longer runs out at the end of a hand-typed table.
+"""
+
+from bisect import bisect_left
+from collections.abc import Iterable, Sequence
+from datetime import date, timedelta
+from enum import IntEnum
+from functools import lru_cache
+
+DAY_NUM = {"Monday": 0, "Tuesday": 1, "Wednesday": 2, "Thursday": 3, "Friday": 4}
+DAY_NAMES = tuple(DAY_NUM)
+
+# Every schedule the routes layer uses maps to one of these week sets
+WEEK_SETS = (frozenset({1, 3}), frozenset({2, 4}), frozenset({1, 2, 3, 4}))
+
+# How far past the start year next_dates will look to fill `count`
+MAX_YEARS_AHEAD = 2
+
+
+class Schedule(IntEnum):
+    """Posted week set, as a bitmask of sweep weeks (bit 0 = week 1)."""
+
+    WEEKS_1_3 = 0b0101
+    WEEKS_2_4 = 0b1010
+    EVERY_WEEK = 0b1111
+
+    @classmethod
+    def parse(cls, schedule: "str | Schedule") -> "Schedule":
+        """Parse a schedule string like '1 & 3' or '2 & 4'."""
+        if isinstance(schedule, Schedule):
+            return schedule
+        if "1" in schedule and "3" in schedule:
+            return cls.WEEKS_1_3
+        if "2" in schedule and "4" in schedule:
+            return cls.WEEKS_2_4
+        return cls.EVERY_WEEK
+
+    @property
+    def weeks(self) -> frozenset[int]:
+        return frozenset(w for w in range(1, 5) if self & (1 << (w - 1)))
+
+
+def days_to_mask(day_names: Iterable[str]) -> int:
+    """Weekday names → bitmask (bit 0 = Monday). Unknown names are dropped."""
+    mask = 0
+    for name in day_names:
+        if name in DAY_NUM:
+            mask |= 1 << DAY_NUM[name]
+    return mask
+
+
+@lru_cache(maxsize=32)
+def mask_to_days(mask: int) -> tuple[str, ...]:
+    """Bitmask → weekday names, Monday first."""
+    return tuple(name for i, name in enumerate(DAY_NAMES) if mask & (1 << i))
+
+
+# A schedule code packs a weekday mask (bits 0-4) and a Schedule week mask
+# (bits 5-8) into one small int
+WEEK_SHIFT = 5
+DAY_BITS = (1 << WEEK_SHIFT) - 1
+WEEK_BITS = 0b1111 << WEEK_SHIFT
+
+
+def schedule_code(days: int, schedule: "str | Schedule") -> int:
+    """Pack a weekday bitmask and a schedule into one schedule code."""
+    return days | Schedule.parse(schedule) << WEEK_SHIFT
+
+
+@lru_cache(maxsize=64)
+def valid_weeks(schedule: "str | Schedule") -> frozenset[int]:
+    """Parse a schedule string like '1 & 3' or '2 & 4' into valid week numbers."""
+    return Schedule.parse(schedule).weeks
+
+
+# ---------------------------------------------------------------------------
+# Calendar rules
+# ---------------------------------------------------------------------------
+
+
+@lru_cache(maxsize=16)
+def posted_weeks(year: int) -> dict[date, int]:
+    """
+    Date → sweep week number (1-4) for each month of `year`. Dates absent
+    from the dict are non-posted. A December week 4 may run into January.
+    """
+    weeks: dict[date, int] = {}
+    for month in range(1, 13):
+        first = date(year, month, 1)
+        # First Monday whose whole Mon-Fri row is inside the month
+        monday = first + timedelta(days=(7 - first.weekday()) % 7)
+        for week in range(1, 5):
+            start = monday + timedelta(weeks=week - 1)
+            for offset in range(5):  # Mon through Fri
+                weeks[start + timedelta(days=offset)] = week
+    return weeks
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """The nth (1-based) `weekday` of a month; n=-1 for the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(d: date) -> date:
+    """Saturday holidays are observed Friday, Sunday holidays Monday."""
+    if d.weekday() == 5:
+        return d - timedelta(days=1)
+    if d.weekday() == 6:
+        return d + timedelta(days=1)
+    return d
+
+
+@lru_cache(maxsize=16)
+def city_holidays(year: int) -> frozenset[date]:
+    """LA city holidays observed for `year` (no sweep enforcement)."""
+    thanksgiving = _nth_weekday(year, 11, 3, 4)
+    return frozenset(
+        {
+            _observed(date(year, 1, 1)),  # New Year's Day
+            _nth_weekday(year, 1, 0, 3),  # MLK Day
+            _nth_weekday(year, 2, 0, 3),  # Presidents' Day
+            _observed(date(year, 3, 31)),  # Cesar Chavez Day
+            _nth_weekday(year, 5, 0, -1),  # Memorial Day
+            _observed(date(year, 7, 4)),  # Independence Day
+            _nth_weekday(year, 9, 0, 1),  # Labor Day
+            _observed(date(year, 11, 11)),  # Veterans Day
+            thanksgiving,  # Thanksgiving
+            thanksgiving + timedelta(days=1),  # Day after Thanksgiving
+            _observed(date(year, 12, 25)),  # Christmas
+        }
+    )
+
+
+@lru_cache(maxsize=16)
+def _year_tables(year: int) -> tuple[dict[date, int], frozenset[date]]:
+    """Sweep weeks and holidays falling inside calendar year `year`."""
+    weeks = {
+        d: w
+        for table in (posted_weeks(year - 1), posted_weeks(year))
+        for d, w in table.items()
+        if d.year == year
+    }
+    holidays = frozenset(
+        d for d in city_holidays(year) | city_holidays(year + 1) if d.year == year
+    )
+    return weeks, holidays
+
+
+def date_code(d: date) -> int:
+    """
+    The schedule-code bits `d` satisfies: its weekday bit plus its sweep
+    week bit. 0 when nothing is swept on `d` (non-posted week, holiday).
+    """
+    sweep_weeks, holidays = _year_tables(d.year)
+    week = sweep_weeks.get(d)
+    if week is None or d in holidays:
+        return 0
+    return 1 << d.weekday() | 1 << (week - 1 + WEEK_SHIFT)
+
+
+def code_matches(code: int, day: int) -> bool:
+    """Does schedule code `code` sweep on a date whose date_code is `day`?"""
+    hit = code & day
+    return bool(hit & DAY_BITS) and bool(hit & WEEK_BITS)
+
+
+def sweep_day_mask(codes: Sequence[int], d: date) -> list[bool]:
+    """
+    Evaluate many schedule codes against one date: the date is reduced to
+    its date_code once, then each code is two AND tests.
+    """
+    day = date_code(d)
+    return [code_matches(code, day) for code in codes]
+
+
+# ---------------------------------------------------------------------------
+# Calendar engine
+# ---------------------------------------------------------------------------
+
+
+class SweepCalendar:
+    """
+    Sorted sweep dates per (year, weekday, week-set), built lazily the first
+    time a year is touched. "Next N dates" is a bisect plus a slice, spilling
+    into the following year's list when needed.
+    """
+
+    def __init__(self):
+        self._dates: dict[tuple[int, int, frozenset[int]], list[date]] = {}
+
+    def dates(self, year: int, dow: int, weeks: frozenset[int]) -> list[date]:
+        """All sweep dates in `year` for a weekday/week-set, ascending."""
+        key = (year, dow, weeks)
+        if key not in self._dates:
+            sweep_weeks, holidays = _year_tables(year)
+            self._dates[key] = sorted(
+                d
+                for d, week in sweep_weeks.items()
+                if d.weekday() == dow and week in weeks and d not in holidays
+            )
+        return self._dates[key]
+
+    def next_dates(
+        self, day_name: str, schedule: str | Schedule, start: date, count: int
+    ) -> list[date]:
+        """The next `count` sweep dates on or after `start`."""
+        dow = DAY_NUM.get(day_name)
+        if dow is None:
+            return []
+        weeks = valid_weeks(schedule)
+        dates = self.dates(start.year, dow, weeks)
+        i = bisect_left(dates, start)
+        result = dates[i : i + count]
+        for year in range(start.year + 1, start.year + 1 + MAX_YEARS_AHEAD):
+            if len(result) >= count:
+                break
+            result += self.dates(year, dow, weeks)[: count - len(result)]
+        return result
+
+    def next_dates_batch(
+        self, queries: Iterable[tuple[str, str]], start: date, count: int
+    ) -> dict[tuple[str, str], list[date]]:
+        """next_dates for many (day_name, schedule) pairs, deduplicated."""
+        return {
+            (day_name, schedule): self.next_dates(day_name, schedule, start, count)
+            for day_name, schedule in set(queries)
+        }
+
+    def is_sweep_day(self, d: date, day_name: str, schedule: str | Schedule) -> bool:
+        """Check if `d` is a sweep date for the given day and schedule."""
+        dow = DAY_NUM.get(day_name)
+        if dow is None:
+            return False
+        return code_matches(schedule_code(1 << dow, schedule), date_code(d))
@@ -1,18 +1,138 @@
+import asyncio
 import json
 from datetime import date, datetime, timedelta
 from unittest.mock import patch
 
 import pytest
+from cachetools import TTLCache
 
+import cache_db
 import db as db_mod
+import la_sweep_bot
+from addresses import canonical_address, parse_address
+from gazetteer import Gazetteer, import_address_points, load_gazetteer
 from la_sweep_bot import (
     LA_TZ,
-    SWEEP_WEEK_2026,
     format_street_summary,
     is_sweep_today,
     next_sweep_dates,
+    next_sweep_dates_batch,
     normalize_address,
+    query_sweep_routes,
 )
+from notifier import LATENCY_SAMPLE, NotificationSender, SendStats
+from records import RouteRecord, Subscription
+from route_index import (
+    RouteIndex,
+    load_replica,
+    merge_boxes,
+    paths_distance,
+    save_replica,
+)
+from schedule_index import ScheduleIndex, StreetSegment
+from sweep_calendar import (
+    Schedule,
+    SweepCalendar,
+    city_holidays,
+    days_to_mask,
+    mask_to_days,
+    posted_weeks,
+    schedule_code,
+    sweep_day_mask,
+)
+
+# ---------------------------------------------------------------------------
+# Golden 2026 calendar, hand-typed from the StreetsLA PDF. The generated
+# calendar in sweep_calendar must reproduce it exactly.
+# ---------------------------------------------------------------------------
+
+HOLIDAYS_2026 = {
+    date(2026, 1, 1),  # New Year's Day
+    date(2026, 1, 19),  # MLK Day
+    date(2026, 2, 16),  # Presidents' Day
+    date(2026, 3, 31),  # Cesar Chavez Day
+    date(2026, 5, 25),  # Memorial Day
+    date(2026, 7, 3),  # Independence Day (observed)
+    date(2026, 9, 7),  # Labor Day
+    date(2026, 11, 11),  # Veterans Day
+    date(2026, 11, 26),  # Thanksgiving
+    date(2026, 11, 27),  # Day after Thanksgiving
+    date(2026, 12, 25),  # Christmas
+}
+
+# https://streets.lacity.gov/sites/default/files/2025-12/Sweeping2026.pdf
+# Each month has exactly 4 posted sweep weeks starting on the first full
+# Monday-Friday row. Partial weeks at month edges are non-posted.
+# Week 1 & 3 match "1st & 3rd" schedule, week 2 & 4 match "2nd & 4th".
+_SWEEP_MONDAYS_2026 = [
+    # January
+    (date(2026, 1, 5), 1),
+    (date(2026, 1, 12), 2),
+    (date(2026, 1, 19), 3),
+    (date(2026, 1, 26), 4),
+    # February
+    (date(2026, 2, 2), 1),
+    (date(2026, 2, 9), 2),
+    (date(2026, 2, 16), 3),
+    (date(2026, 2, 23), 4),
+    # March
+    (date(2026, 3, 2), 1),
+    (date(2026, 3, 9), 2),
+    (date(2026, 3, 16), 3),
+    (date(2026, 3, 23), 4),
+    # April
+    (date(2026, 4, 6), 1),
+    (date(2026, 4, 13), 2),
+    (date(2026, 4, 20), 3),
+    (date(2026, 4, 27), 4),
+    # May
+    (date(2026, 5, 4), 1),
+    (date(2026, 5, 11), 2),
+    (date(2026, 5, 18), 3),
+    (date(2026, 5, 25), 4),
+    # June
+    (date(2026, 6, 1), 1),
+    (date(2026, 6, 8), 2),
+    (date(2026, 6, 15), 3),
+    (date(2026, 6, 22), 4),
+    # July
+    (date(2026, 7, 6), 1),
+    (date(2026, 7, 13), 2),
+    (date(2026, 7, 20), 3),
+    (date(2026, 7, 27), 4),
+    # August
+    (date(2026, 8, 3), 1),
+    (date(2026, 8, 10), 2),
+    (date(2026, 8, 17), 3),
+    (date(2026, 8, 24), 4),
+    # September
+    (date(2026, 9, 7), 1),
+    (date(2026, 9, 14), 2),
+    (date(2026, 9, 21), 3),
+    (date(2026, 9, 28), 4),
+    # October
+    (date(2026, 10, 5), 1),
+    (date(2026, 10, 12), 2),
+    (date(2026, 10, 19), 3),
+    (date(2026, 10, 26), 4),
+    # November
+    (date(2026, 11, 2), 1),
+    (date(2026, 11, 9), 2),
+    (date(2026, 11, 16), 3),
+    (date(2026, 11, 23), 4),
+    # December
+    (date(2026, 12, 7), 1),
+    (date(2026, 12, 14), 2),
+    (date(2026, 12, 21), 3),
+    (date(2026, 12, 28), 4),
+]
+
+# Build lookup: date → sweep week number (1-4)
+# Dates absent from this dict are non-posted (no sweeping on posted routes)
+SWEEP_WEEK_2026: dict[date, int] = {}
+for _monday, _week in _SWEEP_MONDAYS_2026:
+    for _offset in range(5):  # Mon through Fri
+        SWEEP_WEEK_2026[_monday + timedelta(days=_offset)] = _week
 
 
 def _patch_today(d, hour=12):
@@ -25,6 +145,12 @@ def _patch_today(d, hour=12):
 
 
 class TestSweepWeekCalendar:
+    def test_generated_2026_matches_golden_table(self):
+        assert posted_weeks(2026) == SWEEP_WEEK_2026
+
+    def test_generated_2026_holidays_match_golden_list(self):
+        assert city_holidays(2026) == HOLIDAYS_2026
+
     def test_first_week(self):
         assert SWEEP_WEEK_2026[date(2026, 3, 2)] == 1  # Mon of 1st week
 
@@ -105,11 +231,109 @@ class TestNextSweepDates:
             # MLK Day is 2026-01-19, should not appear
             assert date(2026, 1, 19) not in dates
 
+    def test_continues_into_next_year(self):
+        with _patch_today(date(2026, 12, 29)):
+            dates = next_sweep_dates("Monday", "2 & 4", count=2)
+        assert dates == [date(2027, 1, 11), date(2027, 1, 25)]
+
     def test_invalid_day_returns_empty(self):
         with _patch_today(date(2026, 3, 1)):
             assert next_sweep_dates("Saturday", "1 & 3") == []
 
 
+def _scan_sweep_dates(day_name, schedule, start, count):
+    """The original day-by-day scan, kept as a reference implementation."""
+    dow = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"].index(day_name)
+    weeks = {1, 3} if "1" in schedule else {2, 4} if "2" in schedule else {1, 2, 3, 4}
+    results = []
+    d = start
+    for _ in range(120):
+        week = SWEEP_WEEK_2026.get(d)
+        if d.weekday() == dow and week in weeks and d not in HOLIDAYS_2026:
+            results.append(d)
+            if len(results) >= count:
+                break
+        d += timedelta(days=1)
+    return results
+
+
+class TestSweepCalendar:
+    calendar = SweepCalendar()
+
+    @pytest.mark.parametrize("schedule", ["1 & 3", "2 & 4", "Weekly"])
+    @pytest.mark.parametrize("day_name", ["Monday", "Wednesday", "Friday"])
+    def test_matches_day_scan(self, day_name, schedule):
+        start = date(2026, 1, 1)
+        while start < date(2026, 9, 1):
+            expected = _scan_sweep_dates(day_name, schedule, start, 3)
+            assert self.calendar.next_dates(day_name, schedule, start, 3) == expected
+            start += timedelta(days=3)
+
+    def test_crosses_year_boundary(self):
+        # Dec 29 2026 is a week-4 Tuesday; Jan 2027's first full row starts Jan 4
+        dates = self.calendar.next_dates("Tuesday", "1 & 3", date(2026, 12, 29), 3)
+        assert dates == [date(2027, 1, 5), date(2027, 1, 19), date(2027, 2, 2)]
+
+    def test_december_week_4_spills_into_january(self):
+        # Fri Jan 1 2027 belongs to Dec 2026's week 4 but is New Year's Day
+        dates = self.calendar.next_dates("Friday", "2 & 4", date(2026, 12, 30), 1)
+        assert dates == [date(2027, 1, 15)]
+
+    def test_holidays_skipped_in_later_years(self):
+        # MLK Day 2027 is Mon Jan 18, a week-3 Monday
+        dates = self.calendar.next_dates("Monday", "1 & 3", date(2027, 1, 1), 2)
+        assert date(2027, 1, 18) not in dates
+        assert dates[0] == date(2027, 1, 4)
+
+    def test_saturday_new_year_observed_previous_friday(self):
+        # Jan 1 2028 is a Saturday → observed Fri Dec 31 2027
+        assert date(2027, 12, 31) in city_holidays(2028)
+        assert not self.calendar.is_sweep_day(date(2027, 12, 31), "Friday", "Weekly")
+
+    def test_batch_answers_each_pair(self):
+        start = date(2026, 3, 1)
+        pairs = [("Monday", "2 & 4"), ("Tuesday", "1 & 3"), ("Monday", "2 & 4")]
+        result = self.calendar.next_dates_batch(pairs, start, 2)
+        assert set(result) == {("Monday", "2 & 4"), ("Tuesday", "1 & 3")}
+        assert result[("Monday", "2 & 4")] == [date(2026, 3, 9), date(2026, 3, 23)]
+        assert result[("Tuesday", "1 & 3")] == [date(2026, 3, 3), date(2026, 3, 17)]
+
+    def test_batch_via_bot_uses_today(self):
+        with _patch_today(date(2026, 3, 9)):
+            result = next_sweep_dates_batch([("Monday", "2 & 4")], count=1)
+        assert result == {("Monday", "2 & 4"): [date(2026, 3, 9)]}
+
+
+class TestSweepDayMask:
+    # Every weekday mask against every schedule
+    codes = tuple(
+        schedule_code(days, schedule) for days in range(32) for schedule in Schedule
+    )
+
+    def _expected(self, code, d):
+        # Straight from the golden 2026 tables, not the calendar engine
+        week = SWEEP_WEEK_2026.get(d)
+        if week is None or d in HOLIDAYS_2026:
+            return False
+        return bool(code & 1 << d.weekday()) and week in Schedule(code >> 5).weeks
+
+    def test_matches_golden_2026(self):
+        d = date(2026, 1, 1)
+        while d < date(2027, 1, 1):
+            assert sweep_day_mask(self.codes, d) == [
+                self._expected(code, d) for code in self.codes
+            ]
+            d += timedelta(days=1)
+
+    def test_holiday_matches_nothing(self):
+        # MLK Day, a week-3 Monday
+        assert not any(sweep_day_mask(self.codes, date(2026, 1, 19)))
+
+    def test_subscription_code(self):
+        sub = _sub(1, ["Monday", "Friday"], "1 & 3")
+        assert sub.code == 0b0101_10001
+
+
 class TestFormatStreetSummary:
     def _make_details(self, **overrides):
         defaults = {
@@ -145,6 +369,27 @@ class TestFormatStreetSummary:
         result = format_street_summary(self._make_details(sweep_schedule="2 & 4"))
         assert "2 & 4" in result
 
+    def test_card_rendered_once_per_day(self, monkeypatch):
+        monkeypatch.setattr(la_sweep_bot, "_card_cache", la_sweep_bot.LRUCache(16))
+        calls = []
+
+        def render(details):
+            calls.append(details["street_name"])
+            return format_street_summary(details)
+
+        monkeypatch.setattr(la_sweep_bot, "format_street_summary", render)
+        details = self._make_details()
+        with _patch_today(date(2026, 3, 9)):
+            first = la_sweep_bot.street_card(details)
+            assert la_sweep_bot.street_card(dict(details)) == first
+            la_sweep_bot.street_card(self._make_details(sweep_time="10am-12pm"))
+        assert len(calls) == 2
+        # LA midnight: yesterday's cards are dropped and re-rendered
+        with _patch_today(date(2026, 3, 10)):
+            assert la_sweep_bot.street_card(details) != first
+        assert len(calls) == 3
+        assert len(la_sweep_bot._card_cache) == 1
+
 
 # ---------------------------------------------------------------------------
 # Subscription DB tests (use in-memory SQLite)
@@ -162,6 +407,7 @@ async def mem_db(monkeypatch):
     monkeypatch.setattr(db_mod, "DB_PATH", tmp.name)
     await db_mod.init_db()
     yield tmp.name
+    await db_mod.close_db()
     os.unlink(tmp.name)
 
 
@@ -181,8 +427,9 @@ class TestSubscriptionDB:
         assert err is None
         subs = await db_mod.get_user_subscriptions(123)
         assert len(subs) == 1
-        assert subs[0]["label"] == "Test Addr"
-        assert json.loads(subs[0]["sweep_days"]) == ["Monday"]
+        assert subs[0].label == "Test Addr"
+        assert subs[0].sweep_days == ("Monday",)
+        assert subs[0].schedule is Schedule.WEEKS_1_3
 
     async def test_upsert_same_location(self, mem_db):
         await db_mod.add_subscription(
@@ -207,7 +454,7 @@ class TestSubscriptionDB:
         )
         subs = await db_mod.get_user_subscriptions(123)
         assert len(subs) == 1
-        assert subs[0]["label"] == "New Label"
+        assert subs[0].label == "New Label"
 
     async def test_subscription_cap(self, mem_db):
         for i in range(db_mod.MAX_SUBSCRIPTIONS_PER_USER):
@@ -248,7 +495,7 @@ class TestSubscriptionDB:
             street_name=None,
         )
         subs = await db_mod.get_user_subscriptions(123)
-        count = await db_mod.remove_subscription(123, subs[0]["id"])
+        count = await db_mod.remove_subscription(123, subs[0].id)
         assert count == 1
         assert await db_mod.get_user_subscriptions(123) == []
 
@@ -268,6 +515,33 @@ class TestSubscriptionDB:
         assert count == 3
         assert await db_mod.get_user_subscriptions(123) == []
 
+    async def test_connection_is_reused_in_wal_mode(self, mem_db):
+        await db_mod.get_user_subscriptions(1)
+        conn = db_mod._db
+        await db_mod.get_user_subscriptions(2)
+        assert db_mod._db is conn
+        async with db_mod._connect() as db:
+            cursor = await db.execute("PRAGMA journal_mode")
+            assert (await cursor.fetchone())[0] == "wal"
+
+    async def test_concurrent_adds_respect_cap(self, mem_db):
+        results = await asyncio.gather(
+            *(
+                _add(123, ["Monday"], "1 & 3", x=-118.0 + i * 0.01)
+                for i in range(db_mod.MAX_SUBSCRIPTIONS_PER_USER + 3)
+            )
+        )
+        assert sum(r is None for r in results) == db_mod.MAX_SUBSCRIPTIONS_PER_USER
+
+    async def test_remove_for_many_chats(self, mem_db):
+        for chat_id in (1, 2, 3):
+            await _add(chat_id, ["Monday"], "1 & 3")
+        await _add(1, ["Monday"], "1 & 3", x=-118.0)
+        assert await db_mod.remove_subscriptions_for_chats([1, 3, 99]) == 3
+        assert await db_mod.remove_subscriptions_for_chats([]) == 0
+        assert await db_mod.get_user_subscriptions(1) == []
+        assert len(await db_mod.get_user_subscriptions(2)) == 1
+
     async def test_get_empty(self, mem_db):
         subs = await db_mod.get_user_subscriptions(999)
         assert subs == []
@@ -297,6 +571,75 @@ class TestSubscriptionDB:
         assert len(all_subs) == 2
 
 
+async def _add(chat_id, days, schedule, x=-118.25):
+    return await db_mod.add_subscription(
+        chat_id=chat_id,
+        x=x,
+        y=34.05,
+        label=f"Addr {chat_id}",
+        sweep_days=days,
+        sweep_schedule=schedule,
+        sweep_time=None,
+        street_name=None,
+    )
+
+
+@pytest.mark.asyncio
+class TestDueSubscriptions:
+    async def test_filters_by_day_and_schedule(self, mem_db):
+        await _add(1, ["Monday"], "2 & 4")
+        await _add(2, ["Monday"], "1 & 3")
+        await _add(3, ["Tuesday", "Monday"], "2 & 4")
+        await _add(4, ["Friday"], "2 & 4")
+        due = [s async for s in db_mod.iter_subscriptions([("Monday", "2 & 4")])]
+        assert [s.chat_id for s in due] == [1, 3]
+
+    async def test_subscription_matching_two_pairs_returned_once(self, mem_db):
+        await _add(1, ["Monday", "Tuesday"], "2 & 4")
+        pairs = [("Monday", "2 & 4"), ("Tuesday", "2 & 4")]
+        due = [s async for s in db_mod.iter_subscriptions(pairs)]
+        assert len(due) == 1
+
+    async def test_empty_pairs(self, mem_db):
+        await _add(1, ["Monday"], "2 & 4")
+        assert [s async for s in db_mod.iter_subscriptions([])] == []
+
+    async def test_schedule_pairs_follow_upserts_and_deletes(self, mem_db):
+        await _add(1, ["Monday"], "2 & 4")
+        await _add(2, ["Friday"], "1 & 3")
+        assert sorted(await db_mod.get_schedule_pairs()) == [
+            ("Friday", "1 & 3"),
+            ("Monday", "2 & 4"),
+        ]
+        await _add(1, ["Tuesday"], "1 & 3")  # same location → upsert
+        await db_mod.remove_all_subscriptions(2)
+        assert await db_mod.get_schedule_pairs() == [("Tuesday", "1 & 3")]
+
+    async def test_iter_subscriptions_streams_in_chat_order(self, mem_db):
+        for i, chat_id in enumerate((3, 1, 2, 1, 3)):
+            await _add(chat_id, ["Monday"], "2 & 4", x=-118.0 + i * 0.01)
+        rows = [r async for r in db_mod.iter_subscriptions(batch_size=2)]
+        assert [r.chat_id for r in rows] == [1, 1, 2, 3, 3]
+
+    async def test_iter_subscriptions_filters_by_pairs(self, mem_db):
+        await _add(1, ["Monday"], "2 & 4")
+        await _add(2, ["Monday"], "1 & 3")
+        pairs = [("Monday", "1 & 3")]
+        rows = [r async for r in db_mod.iter_subscriptions(pairs)]
+        assert [r.chat_id for r in rows] == [2]
+
+    async def test_backfills_existing_rows(self, mem_db):
+        import sqlite3
+
+        await _add(1, ["Monday"], "2 & 4")
+        conn = sqlite3.connect(mem_db)
+        with conn:
+            conn.execute("DELETE FROM subscription_days")
+        conn.close()
+        await db_mod.init_db()
+        assert await db_mod.get_schedule_pairs() == [("Monday", "2 & 4")]
+
+
 @pytest.mark.asyncio
 class TestNotificationLogic:
     """Test the date-matching logic used by send_notifications."""
@@ -332,6 +675,269 @@ class TestNotificationLogic:
             assert date(2026, 1, 19) not in dates
 
 
+def _sub(chat_id, days, schedule, **overrides):
+    row = {
+        "id": chat_id,
+        "chat_id": chat_id,
+        "x": -118.25,
+        "y": 34.05,
+        "label": f"Addr {chat_id}",
+        "sweep_days": json.dumps(days),
+        "sweep_schedule": schedule,
+        "sweep_time": "8am-10am",
+        "street_name": "MAIN ST",
+    }
+    row.update(overrides)
+    return Subscription.from_row(row)
+
+
+class TestNotificationPlanner:
+    # Sun Mar 8 2026: Mon Mar 9 is a 2nd Monday, Tue Mar 10 a 2nd Tuesday
+    today = date(2026, 3, 8)
+
+    def test_1_day_and_2_day_alerts(self):
+        subs = [
+            _sub(1, ["Monday"], "2 & 4"),
+            _sub(2, ["Tuesday"], "2 & 4"),
+            _sub(3, ["Monday"], "1 & 3"),
+        ]
+        plan = la_sweep_bot.plan_notifications(subs, self.today)
+        due = {sub.chat_id: (d, away) for sub, d, away in plan}
+        assert due == {1: (date(2026, 3, 9), 1), 2: (date(2026, 3, 10), 2)}
+
+    def test_1_day_takes_priority(self):
+        plan = la_sweep_bot.plan_notifications(
+            [_sub(1, ["Tuesday", "Monday"], "2 & 4")], self.today
+        )
+        assert [(d, away) for _, d, away in plan] == [(date(2026, 3, 9), 1)]
+
+    def test_each_signature_computed_once(self):
+        subs = [_sub(i, ["Monday"], "2 & 4") for i in range(50)]
+        subs += [_sub(100 + i, ["Friday"], "1 & 3") for i in range(50)]
+        with patch("la_sweep_bot._due_sweeps", wraps=la_sweep_bot._due_sweeps) as due:
+            plan = la_sweep_bot.plan_notifications(subs, self.today)
+        assert due.call_count == 1
+        assert len(due.call_args.args[0]) == 2
+        assert len(plan) == 50
+
+
+class TestBuildDigests:
+    def test_one_message_per_chat_with_priority_order(self):
+        plan = [
+            (_sub(1, ["Tuesday"], "2 & 4", id=10, label="Home"), date(2026, 3, 10), 2),
+            (_sub(1, ["Monday"], "2 & 4", id=11, label="Work"), date(2026, 3, 9), 1),
+            (_sub(2, ["Monday"], "2 & 4", id=12), date(2026, 3, 9), 1),
+        ]
+        digests = dict(la_sweep_bot.build_digests(plan))
+        assert set(digests) == {1, 2}
+        text = digests[1]
+        assert text.index("TOMORROW") < text.index("in 2 days")
+        assert text.index("Work") < text.index("Home")
+
+    def test_single_alert_unchanged(self):
+        sub = _sub(1, ["Monday"], "2 & 4")
+        [(_, text)] = la_sweep_bot.build_digests([(sub, date(2026, 3, 9), 1)])
+        assert text == la_sweep_bot._format_alert(sub, date(2026, 3, 9), 1)
+
+
+class TestDigestStream:
+    async def test_groups_chat_runs_across_batches(self):
+        async def rows():
+            yield _sub(1, ["Monday"], "2 & 4", id=1)
+            yield _sub(1, ["Tuesday"], "2 & 4", id=2)
+            yield _sub(2, ["Friday"], "2 & 4", id=3)  # not due
+            yield _sub(3, ["Monday"], "2 & 4", id=4)
+
+        digests = [
+            d async for d in la_sweep_bot._digest_stream(rows(), date(2026, 3, 8))
+        ]
+        assert [chat_id for chat_id, _ in digests] == [1, 3]
+        assert digests[0][1].count("📍") == 2
+
+
+class _FakeBot:
+    def __init__(self, blocked=()):
+        self.sent: list[tuple[int, str]] = []
+        self.blocked = set(blocked)
+
+    async def send_message(self, chat_id, text):
+        from telegram.error import Forbidden
+
+        if chat_id in self.blocked:
+            raise Forbidden("blocked")
+        self.sent.append((chat_id, text))
+
+
+class _FakeContext:
+    def __init__(self, bot):
+        self.bot = bot
+
+
+@pytest.mark.asyncio
+class TestSendNotifications:
+    async def test_sends_due_alerts_and_drops_blocked(self, mem_db):
+        for chat_id, day in ((1, "Monday"), (2, "Tuesday"), (3, "Friday")):
+            await db_mod.add_subscription(
+                chat_id=chat_id,
+                x=-118.25,
+                y=34.05,
+                label=f"Addr {chat_id}",
+                sweep_days=[day],
+                sweep_schedule="2 & 4",
+                sweep_time="8am-10am",
+                street_name="MAIN ST",
+            )
+        bot = _FakeBot(blocked={2})
+        with _patch_today(date(2026, 3, 8), hour=7):
+            await la_sweep_bot.send_notifications(_FakeContext(bot))
+        assert [chat_id for chat_id, _ in bot.sent] == [1]
+        assert "TOMORROW" in bot.sent[0][1]
+        assert await db_mod.get_user_subscriptions(2) == []
+        assert len(await db_mod.get_user_subscriptions(3)) == 1
+
+    async def test_multiple_subscriptions_get_one_message(self, mem_db):
+        for i, day in enumerate(("Monday", "Tuesday", "Monday")):
+            await _add(1, [day], "2 & 4", x=-118.25 + i * 0.01)
+        bot = _FakeBot()
+        with _patch_today(date(2026, 3, 8), hour=7):
+            await la_sweep_bot.send_notifications(_FakeContext(bot))
+        assert len(bot.sent) == 1
+        assert bot.sent[0][1].count("📍") == 3
+
+
+class _ScriptedBot:
+    """Fake bot: per-chat list of exceptions to raise before succeeding."""
+
+    def __init__(self, script=None, delay=0.0):
+        self.script = {k: list(v) for k, v in (script or {}).items()}
+        self.delay = delay
+        self.sent: list[tuple[int, float]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def send_message(self, chat_id, text):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            pending = self.script.get(chat_id)
+            if pending:
+                raise pending.pop(0)
+            self.sent.append((chat_id, asyncio.get_running_loop().time()))
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.mark.asyncio
+class TestNotificationSender:
+    async def test_sends_concurrently(self):
+        bot = _ScriptedBot(delay=0.02)
+        sender = NotificationSender(bot, concurrency=4, global_rate=10_000)
+        stats = await sender.send_all((i, "hi") for i in range(20))
+        assert stats.sent == 20
+        assert bot.max_in_flight == 4
+        assert len(stats.latencies) == 20
+
+    async def test_global_rate_limit(self):
+        bot = _ScriptedBot()
+        sender = NotificationSender(bot, concurrency=8, global_rate=100)
+        await sender.send_all((i, "hi") for i in range(6))
+        times = sorted(t for _, t in bot.sent)
+        assert times[-1] - times[0] >= 0.045
+
+    async def test_per_chat_spacing(self):
+        bot = _ScriptedBot()
+        sender = NotificationSender(
+            bot, concurrency=4, global_rate=10_000, per_chat_interval=0.05
+        )
+        await sender.send_all([(1, "a"), (1, "b"), (2, "c")])
+        chat_1 = [t for chat_id, t in bot.sent if chat_id == 1]
+        assert chat_1[1] - chat_1[0] >= 0.045
+
+    async def test_accepts_async_stream(self):
+        async def messages():
+            for i in range(10):
+                yield i, "hi"
+
+        bot = _ScriptedBot()
+        sender = NotificationSender(bot, concurrency=3, global_rate=10_000)
+        stats = await sender.send_all(messages())
+        assert stats.sent == 10
+
+    async def test_retry_after_is_retried(self):
+        from telegram.error import RetryAfter
+
+        bot = _ScriptedBot({1: [RetryAfter(0)]})
+        sender = NotificationSender(bot, global_rate=10_000, per_chat_interval=0)
+        stats = await sender.send_all([(1, "hi")])
+        assert stats.sent == 1
+        assert stats.retries == 1
+
+    async def test_forbidden_marks_chat_blocked_and_skips_it(self):
+        from telegram.error import Forbidden
+
+        bot = _ScriptedBot({1: [Forbidden("blocked")]})
+        sender = NotificationSender(bot, concurrency=1, global_rate=10_000)
+        stats = await sender.send_all([(1, "a"), (1, "b"), (2, "c")])
+        assert sender.blocked_chats == {1}
+        assert [chat_id for chat_id, _ in bot.sent] == [2]
+        assert stats.blocked == 1
+        assert "p95=" in stats.summary()
+
+    async def test_idle_chat_limiters_are_evicted(self):
+        bot = _ScriptedBot()
+        sender = NotificationSender(
+            bot, concurrency=1, global_rate=10_000, per_chat_interval=0.01
+        )
+        await sender.send_all([(1, "a"), (2, "b")])
+        await asyncio.sleep(0.02)
+        await sender.send_all([(3, "c")])
+        assert list(sender._chats) == [3]
+
+    async def test_latency_sample_is_bounded(self):
+        stats = SendStats()
+        for i in range(LATENCY_SAMPLE * 3):
+            stats.sent += 1
+            stats.add_latency(float(i))
+        assert len(stats.latencies) == LATENCY_SAMPLE
+        assert stats.max_latency == LATENCY_SAMPLE * 3 - 1
+        assert f"max={stats.max_latency:.1f}s" in stats.summary()
+
+
+class TestRecords:
+    def test_day_mask_round_trip(self):
+        mask = days_to_mask(["Friday", "Monday", "Sunday"])
+        assert mask == 0b10001
+        assert mask_to_days(mask) == ("Monday", "Friday")
+
+    @pytest.mark.parametrize(
+        "text, schedule",
+        [
+            ("1 & 3", Schedule.WEEKS_1_3),
+            ("2nd & 4th", Schedule.WEEKS_2_4),
+            ("Weekly", Schedule.EVERY_WEEK),
+        ],
+    )
+    def test_schedule_parse(self, text, schedule):
+        assert Schedule.parse(text) is schedule
+        assert Schedule.parse(schedule) is schedule
+
+    def test_subscription_is_slotted_and_frozen(self):
+        sub = _sub(1, ["Tuesday", "Monday"], "2 & 4")
+        assert sub.days == 0b11
+        assert sub.sweep_days == ("Monday", "Tuesday")
+        assert not hasattr(sub, "__dict__")
+        with pytest.raises(AttributeError):
+            sub.label = "Other"
+
+    def test_route_record_attributes_round_trip(self):
+        attrs = {"STNAME": "MAIN", "Posted_Day": "Monday", "Weeks": "1 & 3"}
+        record = RouteRecord.from_attributes({**attrs, "OBJECTID": 7})
+        assert record.stname == "MAIN"
+        assert record.to_attributes() == attrs
+        assert not hasattr(record, "__dict__")
+
+
 # ---------------------------------------------------------------------------
 # Regression tests
 # ---------------------------------------------------------------------------
@@ -374,3 +980,1015 @@ class TestNormalizeAddress:
         assert not normalize_address("123 Main St, LA 90012").endswith(
             ", Los Angeles, CA"
         )
+
+
+class TestCanonicalAddress:
+    def test_spellings_share_a_key(self):
+        variants = [
+            "230 Bernard Ave",
+            "230 bernard avenue",
+            "230  BERNARD AVE.",
+            normalize_address("230 Bernard Ave"),
+            "230 Bernard Ave, LA",
+        ]
+        assert {canonical_address(v) for v in variants} == {"230 bernard ave"}
+
+    def test_normalized_neighbourhood_keeps_its_key(self):
+        # The bot and web app normalize before geocoding, which appends
+        # ", Los Angeles, CA" after the neighbourhood
+        for address in ("230 Bernard Ave, Venice", "230 Bernard Ave, Venice, CA"):
+            assert canonical_address(normalize_address(address)) == (
+                "230 bernard ave venice"
+            )
+        assert canonical_address(normalize_address("100 Main St, Santa Monica")) == (
+            "100 main st santa monica"
+        )
+
+    def test_parses_parts(self):
+        parsed = parse_address("1234 North Main Street Apt 4, Los Angeles, CA 90012")
+        assert parsed.number == "1234"
+        assert parsed.predir == "n"
+        assert parsed.name == "main"
+        assert parsed.suffix == "st"
+        assert parsed.unit == "4"
+        assert parsed.city == ""
+        assert parsed.zip == "90012"
+
+    def test_zip_and_unit_without_commas(self):
+        assert canonical_address("230 Bernard Ave Venice CA 90291") == (
+            canonical_address("230 Bernard Ave, Venice, California, 90291")
+        )
+        assert canonical_address("W 1st Street #12") == "w 1st st unit 12"
+
+    def test_same_street_in_two_neighbourhoods(self):
+        keys = {
+            canonical_address(normalize_address(a))
+            for a in ("100 W 5th St, San Pedro", "100 W 5th St, Los Angeles")
+        }
+        assert keys == {"100 w 5th st san pedro", "100 w 5th st"}
+
+    def test_other_cities_keep_their_own_key(self):
+        assert canonical_address("100 Main St, Santa Monica") != (
+            canonical_address("100 Main St")
+        )
+
+    def test_suffix_word_as_street_name(self):
+        assert canonical_address("Avenue 50") == "avenue 50"
+
+
+# ---------------------------------------------------------------------------
+# Local routes replica
+# ---------------------------------------------------------------------------
+
+
+def _feature(name, day, paths):
+    return {
+        "attributes": {"STNAME": name, "Posted_Day": day, "Weeks": "1 & 3"},
+        "paths": paths,
+    }
+
+
+# A small grid of streets around (-118.25, 34.05): two E-W streets and one N-S
+_FEATURES = [
+    _feature("MAIN", "Monday", [[[-118.2510, 34.0500], [-118.2490, 34.0500]]]),
+    _feature("SPRING", "Tuesday", [[[-118.2510, 34.0520], [-118.2490, 34.0520]]]),
+    _feature("FIRST", "Friday", [[[-118.2500, 34.0490], [-118.2500, 34.0530]]]),
+    _feature("FAR", "Monday", [[[-118.3000, 34.1000], [-118.2990, 34.1000]]]),
+]
+
+
+class TestRouteIndex:
+    def test_envelope_hits_crossing_segments(self):
+        index = RouteIndex(_FEATURES, capacity=2)
+        box = (-118.2502, 34.0498, -118.2498, 34.0502)
+        names = [a.stname for a in index.query_envelope(box)]
+        assert names == ["MAIN", "FIRST"]
+
+    def test_bbox_overlap_without_geometry_hit(self):
+        # Diagonal segment whose bbox covers the envelope but whose line misses it
+        diag = _feature("DIAG", "Monday", [[[0.0, 0.0], [1.0, 1.0]]])
+        index = RouteIndex([diag])
+        assert index.query_envelope((0.8, 0.0, 1.0, 0.1)) == []
+        assert len(index.query_envelope((0.4, 0.4, 0.6, 0.6))) == 1
+
+    def test_limit(self):
+        index = RouteIndex(_FEATURES)
+        box = (-118.26, 34.04, -118.24, 34.06)
+        assert len(index.query_envelope(box, limit=2)) == 2
+
+    def test_empty_index(self):
+        assert RouteIndex([]).query_envelope((0, 0, 1, 1)) == []
+
+    def test_large_index_matches_brute_force(self):
+        features = [
+            _feature(f"S{i}", "Monday", [[[i * 0.001, 0.0], [i * 0.001, 0.01]]])
+            for i in range(500)
+        ]
+        index = RouteIndex(features)
+        box = (0.1, 0.0, 0.2, 0.005)
+        expected = [f"S{i}" for i in range(100, 201)]
+        assert [a.stname for a in index.query_envelope(box)] == expected
+
+    def test_save_and_load_roundtrip(self, tmp_path):
+        path = str(tmp_path / "routes.json.gz")
+        assert load_replica(path) is None
+        save_replica(_FEATURES, path)
+        index = load_replica(path)
+        assert index is not None
+        assert len(index) == len(_FEATURES)
+        assert index.paths(3) == [[(-118.3, 34.1), (-118.299, 34.1)]]
+        assert index.synced_at is not None
+
+    def test_stale_and_legacy_replicas_load_with_a_warning(self, tmp_path, caplog):
+        import gzip
+
+        path = str(tmp_path / "routes.json.gz")
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump({"synced_at": 0, "features": _FEATURES}, f)
+        index = load_replica(path)
+        assert len(index) == len(_FEATURES)
+        assert "sync-routes" in caplog.text
+
+    def test_equal_records_are_shared(self):
+        twin = _feature("MAIN", "Monday", [[[-118.0, 34.0], [-118.1, 34.0]]])
+        index = RouteIndex([_FEATURES[0], twin])
+        assert index.records[0] is index.records[1]
+        assert index.box(1) == (-118.1, 34.0, -118.0, 34.0)
+
+    async def test_query_sweep_routes_uses_replica(self, monkeypatch):
+        monkeypatch.setattr(la_sweep_bot, "_route_index", RouteIndex(_FEATURES))
+        monkeypatch.setattr(la_sweep_bot, "_route_index_loaded", True)
+        with patch("la_sweep_bot.httpx.AsyncClient") as client:
+            routes = await query_sweep_routes(-118.25, 34.05, radius_ft=200)
+        client.assert_not_called()
+        assert {r.stname for r in routes} == {"MAIN", "FIRST"}
+
+    def test_paths_distance(self):
+        path = [[[0.0, 0.0], [0.0, 1.0]]]
+        assert paths_distance(path, 0.0, 0.5) == 0
+        assert paths_distance(path, 0.0, 2.0) == pytest.approx(1.0)
+        # Longitude shrinks with latitude: 0.001° east at 60°N is 0.0005° of latitude
+        assert paths_distance([[[0.0, 60.0]]], 0.001, 60.0) == pytest.approx(0.0005)
+
+    def test_near_orders_by_distance(self):
+        index = RouteIndex(_FEATURES)
+        box = (-118.26, 34.04, -118.24, 34.06)
+        names = [r.stname for r in index.query_envelope(box, near=(-118.2503, 34.0519))]
+        assert names == ["SPRING", "FIRST", "MAIN"]
+
+    async def test_corner_picks_nearest_street_over_majority(self, monkeypatch):
+        # Two MAIN segments outvote FIRST, but the point sits on FIRST
+        features = [
+            _feature("MAIN", "Monday", [[[-118.2510, 34.0500], [-118.2500, 34.0500]]]),
+            _feature("MAIN", "Monday", [[[-118.2500, 34.0500], [-118.2490, 34.0500]]]),
+            _feature("FIRST", "Friday", [[[-118.2497, 34.0490], [-118.2497, 34.0530]]]),
+        ]
+        monkeypatch.setattr(la_sweep_bot, "_route_index", RouteIndex(features))
+        monkeypatch.setattr(la_sweep_bot, "_route_index_loaded", True)
+        details = await la_sweep_bot.get_sweep_details(-118.2497, 34.0504)
+        assert details["street_name"] == "FIRST"
+        assert details["sweep_days"] == ["Friday"]
+
+
+# First Monday of a "1 & 3" week, and the Monday after (week 2 or 4)
+_MONDAY_W1 = SweepCalendar().next_dates("Monday", "1 & 3", date(2026, 3, 1), 1)[0]
+_MONDAY_W2 = _MONDAY_W1 + timedelta(weeks=1)
+
+
+class TestScheduleIndex:
+    def _index(self):
+        records = RouteIndex(_FEATURES).records + [
+            RouteRecord(stname="MAIN", posted_day="Monday", weeks="1 & 3"),
+            RouteRecord(stname="BROADWAY", posted_day=None),
+        ]
+        return ScheduleIndex(records)
+
+    def test_buckets_by_schedule_code(self):
+        index = self._index()
+        monday = schedule_code(days_to_mask(["Monday"]), "1 & 3")
+        # The duplicate MAIN segment is stored once; no posted day, no bucket
+        assert [s.street for s in index.segments(monday)] == ["FAR", "MAIN"]
+        assert len(index) == 4
+
+    def test_sweeping_on(self):
+        index = self._index()
+        assert [s.street for s in index.sweeping_on(_MONDAY_W1)] == ["FAR", "MAIN"]
+        assert index.sweeping_on(_MONDAY_W2) == []
+        tuesday = _MONDAY_W1 + timedelta(days=1)
+        assert index.sweeping_on(tuesday) == [StreetSegment("SPRING", None, None, None)]
+        assert index.active_codes(_MONDAY_W1 - timedelta(days=1)) == []
+
+    def test_streets_sweeping_filters_by_name(self, monkeypatch):
+        monkeypatch.setattr(la_sweep_bot, "_route_index", None)
+        monkeypatch.setattr(la_sweep_bot, "_route_index_loaded", True)
+        assert la_sweep_bot.streets_sweeping(_MONDAY_W1) is None
+        monkeypatch.setattr(la_sweep_bot, "_route_index", RouteIndex(_FEATURES))
+        segments = la_sweep_bot.streets_sweeping(_MONDAY_W1, " main ")
+        assert [s.street for s in segments] == ["MAIN"]
+
+    def test_parse_sweep_date(self):
+        today = date(2026, 3, 8)
+        assert la_sweep_bot.parse_sweep_date("Tomorrow", today) == date(2026, 3, 9)
+        assert la_sweep_bot.parse_sweep_date("today", today) == today
+        assert la_sweep_bot.parse_sweep_date("2026-04-01", today) == date(2026, 4, 1)
+        assert la_sweep_bot.parse_sweep_date("main", today) is None
+
+    async def test_notifications_skip_when_no_bucket_active(self, monkeypatch):
+        monkeypatch.setattr(la_sweep_bot, "_route_index", RouteIndex(_FEATURES))
+        monkeypatch.setattr(la_sweep_bot, "_route_index_loaded", True)
+
+        async def no_db():
+            raise AssertionError("read subscriptions on an idle day")
+
+        monkeypatch.setattr(la_sweep_bot, "get_schedule_pairs", no_db)
+        # Thanksgiving and the day after: nothing is swept
+        with _patch_today(date(2026, 11, 25), hour=7):
+            await la_sweep_bot.send_notifications(_FakeContext(_FakeBot()))
+
+    def test_streets_endpoint(self, monkeypatch):
+        from fastapi.testclient import TestClient
+
+        import web_app
+
+        monkeypatch.setattr(la_sweep_bot, "_route_index", RouteIndex(_FEATURES))
+        monkeypatch.setattr(la_sweep_bot, "_route_index_loaded", True)
+        client = TestClient(web_app.app)
+        resp = client.get("/api/streets", params={"date": _MONDAY_W1.isoformat()})
+        body = resp.json()
+        assert body["date"] == _MONDAY_W1.isoformat()
+        assert [s["street"] for s in body["segments"]] == ["FAR", "MAIN"]
+        assert client.get("/api/streets", params={"date": "soon"}).status_code == 422
+        monkeypatch.setattr(la_sweep_bot, "_route_index", None)
+        assert client.get("/api/streets").status_code == 503
+
+    async def test_refresh_syncs_a_missing_replica(self, monkeypatch, tmp_path):
+        path = str(tmp_path / "routes.json.gz")
+        monkeypatch.setattr(la_sweep_bot, "REPLICA_PATH", path)
+        monkeypatch.setattr(la_sweep_bot, "_route_index", None)
+        monkeypatch.setattr(la_sweep_bot, "_route_index_loaded", False)
+        synced = []
+
+        async def fake_sync(url, out_fields, path):
+            synced.append(path)
+            return save_replica(_FEATURES, path)
+
+        monkeypatch.setattr(la_sweep_bot, "sync_replica", fake_sync)
+        await la_sweep_bot.refresh_route_replica()
+        assert synced == [path]
+        segments = la_sweep_bot.streets_sweeping(_MONDAY_W1)
+        assert [s.street for s in segments] == ["FAR", "MAIN"]
+        # Fresh now, so a restart doesn't sync again
+        await la_sweep_bot.refresh_route_replica()
+        assert synced == [path]
+
+
+# ---------------------------------------------------------------------------
+# Offline address gazetteer
+# ---------------------------------------------------------------------------
+
+# Address-points export fixture: two "100 Main St"s (N and S, different ZIPs),
+# a row with no coordinates, and a duplicate row
+_ADDRESS_POINTS_CSV = """\
+HSE_NBR,HSE_DIR_CD,STR_NM,STR_SFX_CD,STR_SFX_DIR_CD,ZIP_CD,LAT,LON
+230,,BERNARD,AVE,,90291,33.9912,-118.4721
+230,,BERNARD,AVE,,90291,33.9912,-118.4721
+100,N,MAIN,ST,,90012,34.0551,-118.2402
+100,S,MAIN,ST,,90013,34.0508,-118.2466
+1500,W,SUNSET,BLVD,,90026,34.0774,-118.2582
+12,,NOWHERE,LN,,90000,,
+"""
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    src = tmp_path / "address_points.csv"
+    src.write_text(_ADDRESS_POINTS_CSV)
+    path = str(tmp_path / "address_points.tsv.gz")
+    assert import_address_points(str(src), path) == 4
+    return load_gazetteer(path)
+
+
+class TestGazetteer:
+    def test_missing_file(self, tmp_path):
+        assert load_gazetteer(str(tmp_path / "none.tsv.gz")) is None
+
+    def test_packed_rows(self, gazetteer):
+        assert len(gazetteer) == 4
+        assert gazetteer.key(0) == "100 n main st"
+        assert (gazetteer.zips[0], gazetteer.ys[0]) == (90012, 34055100)
+
+    def test_rejects_unsorted_file(self):
+        with pytest.raises(ValueError):
+            Gazetteer.from_lines([b"2 main st\t\t1\t1\n", b"1 main st\t\t1\t1\n"])
+
+    def test_exact_and_variant_spellings(self, gazetteer):
+        for address in (
+            "230 Bernard Ave",
+            "230 bernard avenue, Venice, CA 90291",
+            normalize_address("230 Bernard Ave Apt 2"),
+        ):
+            hit = gazetteer.lookup(address)
+            assert (hit["x"], hit["y"]) == (-118.4721, 33.9912), address
+        assert gazetteer.lookup("230 Bernard Ave")["match_addr"] == (
+            "230 Bernard Ave, Los Angeles, California, 90291"
+        )
+
+    def test_missing_suffix_or_direction(self, gazetteer):
+        assert gazetteer.lookup("230 Bernard")["y"] == 33.9912
+        assert gazetteer.lookup("1500 Sunset Blvd")["y"] == 34.0774
+
+    def test_ambiguous_needs_zip(self, gazetteer):
+        assert gazetteer.lookup("100 Main St") is None
+        assert gazetteer.lookup("100 Main St, LA 90013")["y"] == 34.0508
+        assert gazetteer.lookup("100 S Main St")["y"] == 34.0508
+        assert gazetteer.lookup("100 Main St, Venice, CA") is None
+
+    def test_misses(self, gazetteer):
+        assert gazetteer.lookup("231 Bernard Ave") is None
+        assert gazetteer.lookup("230 Bernard Ave, Santa Monica") is None
+        assert gazetteer.lookup("12 Nowhere Ln") is None
+        assert gazetteer.lookup("Griffith Observatory") is None
+
+    async def test_geocode_address_skips_arcgis(
+        self, monkeypatch, cold_caches, gazetteer
+    ):
+        monkeypatch.setattr(la_sweep_bot, "_gazetteer", gazetteer)
+        client = _SlowClient({"candidates": []})
+        monkeypatch.setattr(la_sweep_bot, "get_http_client", lambda: client)
+        hit = await la_sweep_bot.geocode_address(normalize_address("230 Bernard Ave"))
+        assert hit["score"] == 100
+        batch = await la_sweep_bot.geocode_addresses(["100 S Main St", "1 Nowhere"])
+        assert batch["100 S Main St"]["y"] == 34.0508
+        assert batch["1 Nowhere"] is None
+        # Only the address the gazetteer doesn't know reached ArcGIS
+        assert client.calls == 1
+
+
+# ---------------------------------------------------------------------------
+# Shared HTTP client
+# ---------------------------------------------------------------------------
+
+
+class TestHttpClient:
+    async def test_client_is_shared_until_closed(self):
+        client = la_sweep_bot.get_http_client()
+        assert la_sweep_bot.get_http_client() is client
+        await la_sweep_bot.close_http_client()
+        assert client.is_closed
+        assert la_sweep_bot.get_http_client() is not client
+        await la_sweep_bot.close_http_client()
+
+
+# ---------------------------------------------------------------------------
+# Single-flight coalescing
+# ---------------------------------------------------------------------------
+
+
+class _FakeResponse:
+    def __init__(self, data):
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+class _SlowClient:
+    """Stands in for the shared httpx client; counts upstream calls."""
+
+    def __init__(self, data):
+        self.data = data
+        self.calls = 0
+
+    async def get(self, url, params=None):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return _FakeResponse(self.data)
+
+    async def post(self, url, data=None):
+        return await self.get(url, data)
+
+
+# One MAIN ST segment through (-118.25, 34.05), as the routes layer returns it
+_MAIN_FEATURE = {
+    "attributes": {"STNAME": "MAIN"},
+    "geometry": {"paths": [[[-118.2501, 34.05], [-118.2499, 34.05]]]},
+}
+
+
+@pytest.fixture
+def cold_caches(monkeypatch):
+    monkeypatch.setattr(la_sweep_bot, "_geocode_cache", TTLCache(maxsize=16, ttl=60))
+    monkeypatch.setattr(la_sweep_bot, "_tile_cache", TTLCache(maxsize=16, ttl=60))
+    monkeypatch.setattr(la_sweep_bot, "_tile_inflight", {})
+    monkeypatch.setattr(la_sweep_bot, "_route_index", None)
+    monkeypatch.setattr(la_sweep_bot, "_route_index_loaded", True)
+    monkeypatch.setattr(la_sweep_bot, "_gazetteer", None)
+    monkeypatch.setattr(la_sweep_bot, "_gazetteer_loaded", True)
+    monkeypatch.setattr(la_sweep_bot, "coalesce_stats", la_sweep_bot.Counter())
+
+
+class TestSingleFlight:
+    async def test_concurrent_geocodes_share_one_request(
+        self, monkeypatch, cold_caches
+    ):
+        client = _SlowClient(
+            {
+                "candidates": [
+                    {
+                        "location": {"x": -118.25, "y": 34.05},
+                        "attributes": {"Match_addr": "1 Main St"},
+                        "score": 100,
+                    }
+                ]
+            }
+        )
+        monkeypatch.setattr(la_sweep_bot, "get_http_client", lambda: client)
+        results = await asyncio.gather(
+            *(la_sweep_bot.geocode_address("1 Main St") for _ in range(5)),
+            la_sweep_bot.geocode_address("1  MAIN st"),
+        )
+        assert client.calls == 1
+        assert all(r == results[0] for r in results)
+        assert la_sweep_bot.coalesce_stats["geocode"] == 5
+        assert la_sweep_bot._inflight == {}
+
+    async def test_match_addr_aliases_back_to_the_input(self, monkeypatch, cold_caches):
+        client = _SlowClient(
+            {
+                "candidates": [
+                    {
+                        "location": {"x": -118.47, "y": 33.99},
+                        "attributes": {
+                            "Match_addr": "230 Bernard Ave, Venice, California, 90291"
+                        },
+                        "score": 100,
+                    }
+                ]
+            }
+        )
+        monkeypatch.setattr(la_sweep_bot, "get_http_client", lambda: client)
+        first = await la_sweep_bot.geocode_address("230 bernard avenue")
+        again = await la_sweep_bot.geocode_address("230 Bernard Ave, Venice, CA 90291")
+        assert client.calls == 1
+        assert again == first
+        assert "230 bernard ave venice 90291" in la_sweep_bot._geocode_cache
+
+    async def test_fuzzy_match_is_not_aliased(self, monkeypatch, cold_caches):
+        match = "230 Bernard Ave, Venice, California, 90291"
+        client = _SlowClient(
+            {
+                "candidates": [
+                    {
+                        "location": {"x": -118.47, "y": 33.99},
+                        "attributes": {"Match_addr": match},
+                        "score": 62,
+                    }
+                ]
+            }
+        )
+        monkeypatch.setattr(la_sweep_bot, "get_http_client", lambda: client)
+        await la_sweep_bot.geocode_address("230 Bernad Av, LA")
+        assert canonical_address(match) not in la_sweep_bot._geocode_cache
+
+    async def test_alias_keeps_a_better_entry(self, monkeypatch, cold_caches):
+        match = "230 Bernard Ave, Venice, California, 90291"
+        exact = {"x": -118.47, "y": 33.99, "match_addr": match, "score": 100}
+        la_sweep_bot._geocode_cache[canonical_address(match)] = exact
+        client = _SlowClient(
+            {
+                "candidates": [
+                    {
+                        "location": {"x": -118.4701, "y": 33.9901},
+                        "attributes": {"Match_addr": match},
+                        "score": 95,
+                    }
+                ]
+            }
+        )
+        monkeypatch.setattr(la_sweep_bot, "get_http_client", lambda: client)
+        await la_sweep_bot.geocode_address("230 Bernard, Venice")
+        assert la_sweep_bot._geocode_cache[canonical_address(match)] is exact
+
+    async def test_neighbourhoods_do_not_share_an_entry(self, monkeypatch, cold_caches):
+        client = _SlowClient(
+            {
+                "candidates": [
+                    {
+                        "location": {"x": -118.28, "y": 33.74},
+                        "attributes": {"Match_addr": "100 W 5th St, San Pedro"},
+                        "score": 80,
+                    }
+                ]
+            }
+        )
+        monkeypatch.setattr(la_sweep_bot, "get_http_client", lambda: client)
+        await la_sweep_bot.geocode_address(normalize_address("100 W 5th St, San Pedro"))
+        await la_sweep_bot.geocode_address(normalize_address("100 W 5th St"))
+        assert client.calls == 2
+
+    async def test_concurrent_route_queries_share_one_request(
+        self, monkeypatch, cold_caches
+    ):
+        client = _SlowClient({"features": [_MAIN_FEATURE]})
+        monkeypatch.setattr(la_sweep_bot, "get_http_client", lambda: client)
+        results = await asyncio.gather(
+            *(query_sweep_routes(-118.25, 34.05) for _ in range(4)),
+            query_sweep_routes(-118.25, 34.05, radius_ft=500),
+        )
+        assert client.calls == 1
+        assert results[0] == [RouteRecord(stname="MAIN")]
+        assert la_sweep_bot.coalesce_stats["routes"] == 4
+
+    async def test_one_tile_joins_a_batch_prefetch(self, monkeypatch, cold_caches):
+        client = _SlowClient({"features": [_MAIN_FEATURE]})
+        monkeypatch.setattr(la_sweep_bot, "get_http_client", lambda: client)
+        points = [(-118.25, 34.05), (-118.30, 34.10), (-118.20, 34.00)]
+        prefetch = asyncio.ensure_future(la_sweep_bot.prefetch_sweep_routes(points))
+        await asyncio.sleep(0)
+        routes = await query_sweep_routes(-118.25, 34.05)
+        await prefetch
+        assert client.calls == 1
+        assert routes == [RouteRecord(stname="MAIN")]
+        assert la_sweep_bot.coalesce_stats["routes"] == 1
+        assert la_sweep_bot._tile_inflight == {}
+
+    async def test_failure_propagates_to_all_waiters(self, monkeypatch, cold_caches):
+        class _Broken(_SlowClient):
+            async def get(self, url, params=None):
+                await super().get(url, params)
+                raise RuntimeError("upstream down")
+
+        client = _Broken({})
+        monkeypatch.setattr(la_sweep_bot, "get_http_client", lambda: client)
+        results = await asyncio.gather(
+            *(la_sweep_bot.geocode_address("1 Main St") for _ in range(3)),
+            return_exceptions=True,
+        )
+        assert client.calls == 1
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert "1 main st" not in la_sweep_bot._geocode_cache
+
+
+class _BatchGeocodeClient:
+    """geocodeAddresses + findAddressCandidates stand-in; no match for 'Nowhere'."""
+
+    def __init__(self, max_batch_size=2):
+        self.max_batch_size = max_batch_size
+        self.batches = []
+        self.single = []
+
+    async def get(self, url, params=None):
+        if url == la_sweep_bot.GEOCODE_INFO_URL:
+            return _FakeResponse(
+                {"locatorProperties": {"MaxBatchSize": self.max_batch_size}}
+            )
+        self.single.append(params["singleLine"])
+        candidate = {
+            "location": {"x": -118.0, "y": 34.0},
+            "score": 90,
+            "attributes": {"Match_addr": "single"},
+        }
+        return _FakeResponse({"candidates": [candidate]})
+
+    async def post(self, url, data=None):
+        records = json.loads(data["addresses"])["records"]
+        self.batches.append([r["attributes"]["SingleLine"] for r in records])
+        locations = []
+        for r in records:
+            attrs = r["attributes"]
+            if "Nowhere" in attrs["SingleLine"]:
+                locations.append(
+                    {"attributes": {"ResultID": attrs["OBJECTID"], "Status": "U"}}
+                )
+                continue
+            locations.append(
+                {
+                    "location": {"x": -118.25, "y": 34.05},
+                    "score": 100,
+                    "attributes": {
+                        "ResultID": attrs["OBJECTID"],
+                        "Status": "M",
+                        "Match_addr": attrs["SingleLine"].upper(),
+                    },
+                }
+            )
+        return _FakeResponse({"locations": locations})
+
+
+class TestBatchGeocode:
+    @pytest.fixture
+    def client(self, monkeypatch, cold_caches):
+        client = _BatchGeocodeClient()
+        monkeypatch.setattr(la_sweep_bot, "get_http_client", lambda: client)
+        monkeypatch.setattr(la_sweep_bot, "ARCGIS_API_KEY", "key")
+        monkeypatch.setattr(la_sweep_bot, "_geocode_batch_size", None)
+        return client
+
+    async def test_batches_honor_max_batch_size(self, client):
+        addresses = [f"{n} Main St" for n in range(5)]
+        result = await la_sweep_bot.geocode_addresses(addresses)
+        assert [len(b) for b in client.batches] == [2, 2, 1]
+        assert result["3 Main St"]["match_addr"] == "3 MAIN ST"
+        assert "3 main st" in la_sweep_bot._geocode_cache
+        assert client.single == []
+
+    async def test_unmatched_rows_fall_back_to_single_line(self, client):
+        result = await la_sweep_bot.geocode_addresses(["1 Main St", "Nowhere Rd"])
+        assert client.single == ["Nowhere Rd"]
+        assert result["Nowhere Rd"]["match_addr"] == "single"
+        assert result["1 Main St"]["match_addr"] == "1 MAIN ST"
+
+    async def test_cached_and_duplicate_addresses_not_sent(self, client):
+        la_sweep_bot._geocode_cache["1 main st"] = {"match_addr": "cached"}
+        result = await la_sweep_bot.geocode_addresses(
+            ["1 Main St", "2 Main St", "2  MAIN st"]
+        )
+        assert client.batches == [["2 Main St"]]
+        assert result["1 Main St"] == {"match_addr": "cached"}
+        assert result["2  MAIN st"] == result["2 Main St"]
+
+    async def test_rows_are_reported_as_they_resolve(self, client, monkeypatch):
+        release = asyncio.Event()
+        get = client.get
+
+        async def slow_single_line(url, params=None):
+            if url != la_sweep_bot.GEOCODE_INFO_URL:
+                await release.wait()
+            return await get(url, params)
+
+        monkeypatch.setattr(client, "get", slow_single_line)
+        reported = {}
+        task = asyncio.ensure_future(
+            la_sweep_bot.geocode_addresses(
+                ["1 Main St", "Nowhere Rd", "1 MAIN ST"],
+                on_result=reported.__setitem__,
+            )
+        )
+        while "1 MAIN ST" not in reported:
+            await asyncio.sleep(0)
+        # The matched row is out while its chunk's fallback is still running
+        assert "Nowhere Rd" not in reported
+        release.set()
+        assert await task == reported
+        assert reported["Nowhere Rd"]["match_addr"] == "single"
+
+    async def test_without_api_key_uses_single_line(self, client, monkeypatch):
+        monkeypatch.setattr(la_sweep_bot, "ARCGIS_API_KEY", "")
+        await la_sweep_bot.geocode_addresses(["1 Main St", "2 Main St"])
+        assert client.batches == []
+        assert sorted(client.single) == ["1 Main St", "2 Main St"]
+
+    async def test_one_failed_fallback_keeps_the_rest(self, client, monkeypatch):
+        import httpx
+
+        monkeypatch.setattr(la_sweep_bot, "ARCGIS_API_KEY", "")
+        get = client.get
+
+        async def flaky_get(url, params=None):
+            if params and params.get("singleLine") == "2 Main St":
+                raise httpx.ReadTimeout("timed out")
+            return await get(url, params)
+
+        monkeypatch.setattr(client, "get", flaky_get)
+        result = await la_sweep_bot.geocode_addresses(
+            ["1 Main St", "2 Main St", "3 Main St"]
+        )
+        assert result["2 Main St"] is None
+        assert result["1 Main St"]["match_addr"] == "single"
+        assert result["3 Main St"]["match_addr"] == "single"
+        # The failure isn't cached, so the next lookup retries
+        assert "2 main st" not in la_sweep_bot._geocode_cache
+
+
+class _MultiRouteClient:
+    """Routes layer stand-in for polygon queries, pages of `page_size`."""
+
+    def __init__(self, features=_FEATURES, page_size=100, fail=False):
+        self.features = features
+        self.page_size = page_size
+        self.fail = fail
+        self.posts = []
+        self.gets = 0
+
+    async def get(self, url, params=None):
+        self.gets += 1
+        return _FakeResponse({"features": []})
+
+    async def post(self, url, data=None):
+        self.posts.append(data)
+        if self.fail:
+            return _FakeResponse({"error": {"code": 400}})
+        offset = data["resultOffset"]
+        page = self.features[offset : offset + self.page_size]
+        return _FakeResponse(
+            {
+                "features": [
+                    {"attributes": f["attributes"], "geometry": {"paths": f["paths"]}}
+                    for f in page
+                ],
+                "exceededTransferLimit": offset + self.page_size < len(self.features),
+            }
+        )
+
+
+class TestRouteTiles:
+    points = ((-118.2500, 34.0500), (-118.2995, 34.1000), (-118.2000, 34.0000))
+
+    def _use(self, monkeypatch, client):
+        monkeypatch.setattr(la_sweep_bot, "get_http_client", lambda: client)
+        return client
+
+    def _local(self, x, y, radius_ft=200):
+        box = la_sweep_bot._route_box(x, y, radius_ft)
+        return RouteIndex(_FEATURES).query_envelope(box, limit=10, near=(x, y))
+
+    async def _query_all(self, points):
+        """Prefetch the points' tiles, then query each one (as /api/batch does)."""
+        await la_sweep_bot.prefetch_sweep_routes(points)
+        return [await query_sweep_routes(x, y) for x, y in points]
+
+    async def test_one_request_for_all_tiles(self, monkeypatch, cold_caches):
+        client = self._use(monkeypatch, _MultiRouteClient())
+        results = await self._query_all(self.points)
+        assert len(client.posts) == 1
+        assert [[r.stname for r in routes] for routes in results] == [
+            ["MAIN", "FIRST"],
+            ["FAR"],
+            [],
+        ]
+        # Same answer as the local index gives for each point's envelope
+        for (x, y), routes in zip(self.points, results):
+            assert routes == self._local(x, y)
+
+    async def test_neighbours_share_a_tile(self, monkeypatch, cold_caches):
+        client = self._use(monkeypatch, _MultiRouteClient(page_size=2))
+        await query_sweep_routes(-118.25, 34.05)
+        assert len(client.posts) == 2  # paged
+        for x, y in [(-118.2497, 34.0498), (-118.2480, 34.0470)]:
+            for radius in (200, 500):
+                routes = await query_sweep_routes(x, y, radius_ft=radius)
+                assert routes == self._local(x, y, radius)
+        assert len(client.posts) == 2 and client.gets == 0
+
+    async def test_halo_covers_points_at_the_tile_edge(self, monkeypatch, cold_caches):
+        tile = la_sweep_bot._tile_key(-118.25, 34.05)
+        edge = (tile[0] + 1) * la_sweep_bot.TILE_DEG
+        # A street ~100 ft past the cell's east edge
+        street = _feature(
+            "EDGE", "Monday", [[[edge + 0.0003, 34.04], [edge + 0.0003, 34.06]]]
+        )
+        self._use(monkeypatch, _MultiRouteClient([street]))
+        x, y = edge - 0.00001, 34.05
+        assert la_sweep_bot._tile_key(x, y) == tile
+        routes = await query_sweep_routes(x, y)
+        assert [r.stname for r in routes] == ["EDGE"]
+
+    async def test_chunks_and_duplicates(self, monkeypatch, cold_caches):
+        monkeypatch.setattr(la_sweep_bot, "TILES_PER_QUERY", 2)
+        client = self._use(monkeypatch, _MultiRouteClient())
+        results = await self._query_all(self.points + self.points[:1])
+        assert len(client.posts) == 2
+        assert results[3] == results[0]
+
+    async def test_failed_query_is_not_cached(self, monkeypatch, cold_caches):
+        client = self._use(monkeypatch, _MultiRouteClient(fail=True))
+        await la_sweep_bot.prefetch_sweep_routes(self.points)
+        assert la_sweep_bot._tile_cache == {}
+        assert await query_sweep_routes(-118.25, 34.05) == []
+        assert len(client.posts) == 2
+
+    async def test_prefetch_fetches_each_tile_once(self, monkeypatch, cold_caches):
+        client = self._use(monkeypatch, _MultiRouteClient())
+        await la_sweep_bot.prefetch_sweep_routes(self.points)
+        assert len(client.posts) == 1
+        assert len(la_sweep_bot._tile_cache) == 3
+        await la_sweep_bot.prefetch_sweep_routes(self.points)
+        assert len(client.posts) == 1
+
+    async def test_radius_beyond_halo_rejected(self, monkeypatch, cold_caches):
+        self._use(monkeypatch, _MultiRouteClient())
+        with pytest.raises(ValueError):
+            await query_sweep_routes(-118.25, 34.05, radius_ft=1000)
+
+    async def test_nearest_falls_back_to_500_ft(self, monkeypatch, cold_caches):
+        client = self._use(monkeypatch, _MultiRouteClient())
+        # Nothing within 200 ft; FIRST (x=-118.25) is ~330 ft east
+        x, y = -118.2511, 34.0510
+        routes = await la_sweep_bot.query_nearest_routes(x, y)
+        assert routes[0].stname == "FIRST"
+        assert sorted(r.stname for r in routes) == ["FIRST", "MAIN", "SPRING"]
+        assert await query_sweep_routes(x, y, radius_ft=200) == []
+        assert await query_sweep_routes(x, y, radius_ft=500) == routes
+        assert len(client.posts) == 1
+
+    async def test_nearest_prefers_200_ft(self, monkeypatch, cold_caches):
+        client = self._use(monkeypatch, _MultiRouteClient())
+        routes = await la_sweep_bot.query_nearest_routes(-118.25, 34.05)
+        assert [r.stname for r in routes] == ["MAIN", "FIRST"]
+        assert await la_sweep_bot.query_nearest_routes(-118.25, 34.05) == routes
+        assert len(client.posts) == 1
+
+    async def test_nearest_matches_local_index(self, monkeypatch, cold_caches):
+        self._use(monkeypatch, _MultiRouteClient())
+        upstream = [
+            await la_sweep_bot.query_nearest_routes(x, y)
+            for x, y in [*self.points, (-118.2511, 34.0510)]
+        ]
+        monkeypatch.setattr(la_sweep_bot, "_route_index", RouteIndex(_FEATURES))
+        local = [
+            await la_sweep_bot.query_nearest_routes(x, y)
+            for x, y in [*self.points, (-118.2511, 34.0510)]
+        ]
+        assert upstream == local
+
+    def test_merge_boxes(self):
+        boxes = [(0, 0, 1, 1), (5, 5, 6, 6), (0.5, 0.5, 2, 2), (1.5, 1.5, 5.5, 5.5)]
+        assert merge_boxes(boxes) == [(0, 0, 6, 6)]
+        assert merge_boxes([(0, 0, 1, 1), (2, 2, 3, 3)]) == [
+            (0, 0, 1, 1),
+            (2, 2, 3, 3),
+        ]
+
+
+# ---------------------------------------------------------------------------
+# Persistent lookup cache
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+async def disk_cache(tmp_path):
+    path = str(tmp_path / "lookup_cache.db")
+    await cache_db.open_cache(path)
+    yield path
+    await cache_db.close_cache()
+
+
+async def _flush_cache_writes():
+    await asyncio.gather(*cache_db._pending)
+
+
+class TestLookupCache:
+    async def test_put_then_get(self, disk_cache):
+        cache_db.cache_put("geocode", "1 main st", {"x": 1.0}, ttl=60)
+        cache_db.cache_put("geocode", "nowhere", None, ttl=60)
+        await _flush_cache_writes()
+        assert await cache_db.cache_get("geocode", "1 main st") == {"x": 1.0}
+        assert await cache_db.cache_get("geocode", "nowhere") is None
+        assert await cache_db.cache_get("routes", "1 main st") is cache_db.MISS
+
+    async def test_expired_entries_miss(self, disk_cache):
+        cache_db.cache_put("routes", "k", [], ttl=-1)
+        await _flush_cache_writes()
+        assert await cache_db.cache_get("routes", "k") is cache_db.MISS
+
+    async def test_survives_reopen(self, disk_cache):
+        cache_db.cache_put("geocode", "1 main st", {"x": 1.0}, ttl=60)
+        await cache_db.close_cache()
+
+        await cache_db.open_cache(disk_cache)
+        assert await cache_db.cache_get("geocode", "1 main st") == {"x": 1.0}
+
+    async def test_closed_cache_misses_and_drops_writes(self):
+        assert await cache_db.cache_get("geocode", "x") is cache_db.MISS
+        cache_db.cache_put("geocode", "x", {"x": 2.0}, ttl=60)
+        assert not cache_db._pending
+
+    async def test_geocode_reads_through_to_memory(
+        self, monkeypatch, cold_caches, disk_cache
+    ):
+        cache_db.cache_put("geocode", "1 main st", {"x": 1.0, "y": 2.0}, ttl=60)
+        await _flush_cache_writes()
+        client = _SlowClient({})
+        monkeypatch.setattr(la_sweep_bot, "get_http_client", lambda: client)
+        assert await la_sweep_bot.geocode_address("1 Main St") == {"x": 1.0, "y": 2.0}
+        assert client.calls == 0
+        assert "1 main st" in la_sweep_bot._geocode_cache
+
+    async def test_route_miss_writes_behind(self, monkeypatch, cold_caches, disk_cache):
+        client = _SlowClient({"features": [_MAIN_FEATURE]})
+        monkeypatch.setattr(la_sweep_bot, "get_http_client", lambda: client)
+        await query_sweep_routes(-118.25, 34.05)
+        await _flush_cache_writes()
+        tile = ",".join(map(str, la_sweep_bot._tile_key(-118.25, 34.05)))
+        cached = await cache_db.cache_get("route_tiles", tile)
+        assert cached == [
+            {
+                "attributes": {"STNAME": "MAIN"},
+                "paths": _MAIN_FEATURE["geometry"]["paths"],
+            }
+        ]
+
+    async def test_route_disk_hit_rebuilds_tile(
+        self, monkeypatch, cold_caches, disk_cache
+    ):
+        tile = ",".join(map(str, la_sweep_bot._tile_key(-118.25, 34.05)))
+        features = [
+            _feature("MAIN", "Monday", [[[-118.2501, 34.05], [-118.2499, 34.05]]])
+        ]
+        cache_db.cache_put("route_tiles", tile, features, ttl=60)
+        await _flush_cache_writes()
+        client = _SlowClient({})
+        monkeypatch.setattr(la_sweep_bot, "get_http_client", lambda: client)
+        routes = await query_sweep_routes(-118.25, 34.05)
+        assert [r.stname for r in routes] == ["MAIN"]
+        assert client.calls == 0
+
+
+# ---------------------------------------------------------------------------
+# Web batch endpoint
+# ---------------------------------------------------------------------------
+
+
+class TestBatchEndpoint:
+    @pytest.fixture
+    def client(self, monkeypatch):
+        from fastapi.testclient import TestClient
+
+        import web_app
+
+        self.geocoded = []
+
+        async def fake_geocode(addresses, concurrency, on_result):
+            results = {}
+            # "Slow" addresses come back last, like a single-line fallback
+            for a in sorted(addresses, key=lambda a: "slow" in a.lower()):
+                self.geocoded.append(a)
+                if "slow" in a.lower():
+                    await asyncio.sleep(0.05)
+                results[a] = (
+                    None
+                    if "nowhere" in a.lower()
+                    else {"x": -118.25, "y": 34.05, "match_addr": a, "score": 100}
+                )
+                on_result(a, results[a])
+            return results
+
+        async def fake_lookup(x, y):
+            if x == 0:
+                raise RuntimeError("boom")
+            return {"found": True, "text": f"{x},{y}"}
+
+        async def fake_prefetch(points):
+            self.prefetched.extend(points)
+
+        self.prefetched = []
+        monkeypatch.setattr(web_app, "geocode_addresses", fake_geocode)
+        monkeypatch.setattr(web_app, "prefetch_sweep_routes", fake_prefetch)
+        monkeypatch.setattr(web_app, "lookup_sweep_info", fake_lookup)
+        return TestClient(web_app.app)
+
+    def _post(self, client, **body):
+        resp = client.post("/api/batch", json=body)
+        assert resp.headers["content-type"] == "application/x-ndjson"
+        return {r["index"]: r for r in map(json.loads, resp.text.splitlines())}
+
+    def test_streams_one_line_per_input(self, client):
+        results = self._post(
+            client,
+            addresses=["1 Main St", "Nowhere Rd"],
+            points=[{"lat": 34.05, "lon": -118.25}],
+        )
+        assert set(results) == {0, 1, 2}
+        assert results[0]["found"] and results[0]["address"].startswith("1 Main St")
+        assert not results[1]["found"]
+        assert results[2]["text"] == "-118.25,34.05"
+        # The geocoded address and the point, each prefetched once
+        assert self.prefetched == [(-118.25, 34.05), (-118.25, 34.05)]
+
+    def test_slow_geocode_does_not_hold_back_the_rest(self, client):
+        resp = client.post(
+            "/api/batch",
+            json={
+                "addresses": ["1 Main St", "9 Slow Rd", "2 Main St"],
+                "points": [{"lat": 34.05, "lon": -118.25}],
+            },
+        )
+        order = [json.loads(line)["index"] for line in resp.text.splitlines()]
+        assert sorted(order) == [0, 1, 2, 3]
+        assert order[-1] == 1
+
+    def test_duplicates_looked_up_once(self, client):
+        results = self._post(
+            client, addresses=["1 Main St", "1  main st", "2 Main St", "1 Main St"]
+        )
+        assert set(results) == {0, 1, 2, 3}
+        assert len(self.geocoded) == 2
+
+    def test_one_failure_does_not_end_stream(self, client):
+        results = self._post(
+            client, points=[{"lat": 0, "lon": 0}, {"lat": 34.05, "lon": -118.25}]
+        )
+        assert results[0] == {"index": 0, "found": False, "text": "Lookup failed."}
+        assert results[1]["found"]
+
+    def test_rejects_oversized_batch(self, client):
+        import web_app
+
+        resp = client.post(
+            "/api/batch",
+            json={
+                "addresses": ["1 Main St"] * web_app.BATCH_MAX,
+                "points": [{"lat": 34.05, "lon": -118.25}],
+            },
+        )
+        assert resp.status_code == 422
@@ -3,16 +3,67 @@ Web frontend for LA Street Sweeping lookup.
 Runs alongside the Telegram bot, reusing all sweep logic.
 """
 
+import asyncio
+import json
+import logging
 import os
+from collections.abc import AsyncIterator, Awaitable, Callable, Coroutine
+from contextlib import asynccontextmanager
+from datetime import datetime
+from functools import partial
 
-from fastapi import FastAPI
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
-from la_sweep_bot import geocode_address, lookup_sweep_info, normalize_address
+from addresses import canonical_address
+from cache_db import close_cache, open_cache
+from la_sweep_bot import (
+    LA_TZ,
+    close_http_client,
+    geocode_address,
+    geocode_addresses,
+    get_gazetteer,
+    get_http_client,
+    get_schedule_index,
+    lookup_sweep_info,
+    normalize_address,
+    parse_sweep_date,
+    prefetch_sweep_routes,
+    refresh_route_replica,
+    streets_sweeping,
+)
 
-app = FastAPI()
+# Most addresses + points accepted by one /api/batch request
+BATCH_MAX = 200
+# Single-line geocodes one batch may have in flight (batch-geocode fallbacks)
+BATCH_GEOCODE_CONCURRENCY = 8
+
+logger = logging.getLogger(__name__)
+
+# Background tasks (geocodes, route prefetches) outliving the call that
+# started them
+_background: set[asyncio.Task] = set()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_http_client()
+    # Load the gazetteer and routes replica (if present) now, not on the
+    # first request (loading blocks the event loop)
+    get_gazetteer()
+    get_schedule_index()
+    # Nobody runs sync-routes on the web machine's volume
+    _spawn(refresh_route_replica())
+    # The web machine's own cache (see cache_db), on its own volume
+    await open_cache()
+    yield
+    await close_http_client()
+    await close_cache()
+
+
+app = FastAPI(lifespan=lifespan)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
@@ -25,6 +76,11 @@ class AddressRequest(BaseModel):
     address: str
 
 
+class BatchRequest(BaseModel):
+    addresses: list[str] = Field(default_factory=list, max_length=BATCH_MAX)
+    points: list[CoordsRequest] = Field(default_factory=list, max_length=BATCH_MAX)
+
+
 @app.get("/")
 async def index():
     return FileResponse("static/index.html")
@@ -38,13 +94,20 @@ async def api_lookup(req: CoordsRequest):
 
 @app.post("/api/address")
 async def api_address(req: AddressRequest):
-    address = req.address.strip()
+    return await _lookup_address(req.address)
+
+
+async def _lookup_address(
+    address: str,
+    geocode: Callable[[str], Awaitable[dict | None]] = geocode_address,
+) -> dict:
+    address = address.strip()
     if not address:
         return {"found": False, "text": "Please enter an address."}
 
     address = normalize_address(address)
 
-    geo = await geocode_address(address)
+    geo = await geocode(address)
     if not geo or geo["score"] < 70:
         return {
             "found": False,
@@ -56,6 +119,153 @@ async def api_address(req: AddressRequest):
     return result
 
 
+@app.post("/api/batch")
+async def api_batch(req: BatchRequest):
+    """
+    Look up many addresses and/or points in one request. Duplicates are looked
+    up once, the addresses are geocoded together (see geocode_addresses) and
+    the route queries are batched (see prefetch_sweep_routes). Each result
+    streams back as NDJSON as soon as its own lookup finishes, each line
+    tagged with the index of its input (addresses first, then points).
+    """
+    if len(req.addresses) + len(req.points) > BATCH_MAX:
+        raise HTTPException(
+            status_code=422, detail=f"At most {BATCH_MAX} items per batch"
+        )
+
+    # Each address lookup awaits its own geocode future, resolved as soon as
+    # its geocodeAddresses chunk or fallback returns (see _geocode_batch).
+    # Shielded so a cancelled lookup doesn't cancel it.
+    geocoded: dict[str, asyncio.Future[dict | None]] = {}
+
+    async def _batch_geocode(address: str) -> dict | None:
+        return await asyncio.shield(geocoded[address])
+
+    # Unique lookup → (its lookup call, indices of every input that maps to it)
+    jobs: dict[tuple, tuple[Callable[[], Awaitable[dict]], list[int]]] = {}
+    loop = asyncio.get_running_loop()
+    for i, address in enumerate(req.addresses):
+        address = address.strip()
+        normalized = normalize_address(address) if address else ""
+        key = ("address", canonical_address(normalized))
+        if key not in jobs:
+            jobs[key] = (partial(_lookup_address, address, _batch_geocode), [])
+            if normalized:
+                geocoded[normalized] = loop.create_future()
+        jobs[key][1].append(i)
+    for i, point in enumerate(req.points, len(req.addresses)):
+        key = ("point", point.lat, point.lon)
+        if key not in jobs:
+            jobs[key] = (partial(lookup_sweep_info, x=point.lon, y=point.lat), [])
+        jobs[key][1].append(i)
+
+    # Started before any lookup runs, so the points' tiles are claimed in
+    # TILES_PER_QUERY chunks and each lookup joins its own tile's query
+    if points := [(key[2], key[1]) for key in jobs if key[0] == "point"]:
+        _spawn(prefetch_sweep_routes(points))
+    if geocoded:
+        _spawn(_geocode_batch(geocoded))
+
+    return StreamingResponse(_stream_batch(jobs), media_type="application/x-ndjson")
+
+
+@app.get("/api/streets")
+async def api_streets(date: str = "tomorrow", street: str = ""):
+    """
+    Street segments swept on `date` ('today', 'tomorrow' or YYYY-MM-DD),
+    optionally only streets whose name contains `street`.
+    """
+    d = parse_sweep_date(date, datetime.now(LA_TZ).date())
+    if d is None:
+        raise HTTPException(status_code=422, detail="date must be YYYY-MM-DD")
+    segments = streets_sweeping(d, street)
+    if segments is None:
+        raise HTTPException(status_code=503, detail="Street listings unavailable")
+    return {
+        "date": d.isoformat(),
+        "count": len(segments),
+        "segments": [
+            {
+                "street": s.street,
+                "route": s.route,
+                "boundaries": s.boundaries,
+                "time": s.posted_time,
+            }
+            for s in segments
+        ],
+    }
+
+
+def _spawn(coro: Coroutine) -> None:
+    """Run `coro` in the background, holding a reference until it's done."""
+    task = asyncio.ensure_future(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def _geocode_batch(futures: dict[str, asyncio.Future[dict | None]]) -> None:
+    """
+    Geocode the futures' addresses together, resolving each as soon as its
+    result is in. The results that arrive together have their route tiles
+    prefetched first, so their lookups share a query instead of racing one
+    each.
+    """
+    loop = asyncio.get_running_loop()
+    arrived: dict[str, dict | None] = {}
+
+    def resolve_arrived() -> None:
+        results = dict(arrived)
+        arrived.clear()
+        points = [(g["x"], g["y"]) for g in results.values() if g and g["score"] >= 70]
+        if points:
+            # Scheduled before the lookups these results wake, so it claims
+            # their tiles first
+            _spawn(prefetch_sweep_routes(points))
+        for address, result in results.items():
+            if not futures[address].done():
+                futures[address].set_result(result)
+
+    def on_result(address: str, result: dict | None) -> None:
+        if not arrived:
+            loop.call_soon(resolve_arrived)
+        arrived[address] = result
+
+    try:
+        await geocode_addresses(
+            futures, concurrency=BATCH_GEOCODE_CONCURRENCY, on_result=on_result
+        )
+    except Exception as e:
+        logger.exception("Batch geocode failed")
+        resolve_arrived()
+        for fut in futures.values():
+            if not fut.done():
+                fut.set_exception(e)
+
+
+async def _stream_batch(
+    jobs: dict[tuple, tuple[Callable[[], Awaitable[dict]], list[int]]],
+) -> AsyncIterator[str]:
+    async def run(
+        key: tuple, lookup: Callable[[], Awaitable[dict]]
+    ) -> tuple[tuple, dict]:
+        try:
+            return key, await lookup()
+        except Exception:
+            logger.exception(f"Batch lookup failed for {key}")
+            return key, {"found": False, "text": "Lookup failed."}
+
+    tasks = [asyncio.create_task(run(key, lookup)) for key, (lookup, _) in jobs.items()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            key, result = await next_done
+            for i in jobs[key][1]:
+                yield json.dumps({"index": i, **result}) + "\n"
+    finally:
+        # Client went away mid-stream: stop the remaining lookups
+        for task in tasks:
+            task.cancel()
+
+
 if __name__ == "__main__":
     import uvicorn
 